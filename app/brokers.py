@@ -0,0 +1,244 @@
+import asyncio
+import json
+import logging
+from typing import Callable
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Ограничение PostgreSQL на размер payload в NOTIFY (байт, с запасом)
+NOTIFY_PAYLOAD_LIMIT = 7900
+RECONNECT_DELAY_SECONDS = 1
+
+# Событие "часть событий потеряна, перечитайте данные целиком"
+RESYNC_EVENT = json.dumps({"type": "resync", "payload": {}})
+
+
+class PublishError(Exception):
+    """Пачка отправлена не целиком; unsent - события, которые не ушли."""
+
+    def __init__(self, unsent: list[str]):
+        super().__init__(f"Не отправлено событий: {len(unsent)}")
+        self.unsent = unsent
+
+
+class Broker:
+    """Доставляет сериализованные события всем воркерам.
+
+    Публикации копятся в пачку не дольше batch_window секунд (или до
+    batch_size событий) и уходят одной отправкой.
+    """
+
+    def __init__(self, batch_window: float, batch_size: int):
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.handler: Callable[[list[str]], None] | None = None
+        self._pending: list[str] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    async def start(self, handler: Callable[[list[str]], None]):
+        self.handler = handler
+
+    async def stop(self):
+        self._flush()
+
+    async def send(self, batch: list[str]):
+        """Отправка пачки сразу, мимо буфера.
+
+        Возвращается после фактической отправки; при ошибке бросает
+        PublishError, и вызывающий сам решает, повторить ли отправку.
+        """
+        raise NotImplementedError
+
+    def publish(self, text: str):
+        self._pending.append(text)
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+    def _flush(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            self._send(batch)
+
+    def _deliver(self, batch: list[str]):
+        if self.handler:
+            self.handler(batch)
+
+    def _send(self, batch: list[str]):
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    """Доставка внутри одного процесса (один воркер, тесты)."""
+
+    async def send(self, batch: list[str]):
+        self._deliver(batch)
+
+    def _send(self, batch: list[str]):
+        self._deliver(batch)
+
+
+class PostgresBroker(Broker):
+    """Доставка между воркерами и подами через PostgreSQL LISTEN/NOTIFY."""
+
+    def __init__(self, dsn: str, channel: str, batch_window: float, batch_size: int):
+        super().__init__(batch_window, batch_size)
+        self.dsn = dsn
+        self.channel = channel
+        self._listen_connection = None
+        self._notify_connection = None
+        self._notify_pid: int | None = None
+        # Прошлая отправка не дошла до других воркеров: перед следующей
+        # им нужен сигнал пересинхронизации
+        self._resync_pending = False
+        self._notify_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = False
+
+    async def start(self, handler: Callable[[list[str]], None]):
+        await super().start(handler)
+
+        await self._listen()
+        await self._connect_notify()
+
+    async def _connect_notify(self):
+        import asyncpg
+
+        self._notify_connection = await asyncpg.connect(self.dsn)
+        self._notify_pid = self._notify_connection.get_server_pid()
+
+    async def _listen(self):
+        import asyncpg
+
+        self._listen_connection = await asyncpg.connect(self.dsn)
+        await self._listen_connection.add_listener(self.channel, self._on_notify)
+        self._listen_connection.add_termination_listener(self._on_listen_lost)
+
+    def _on_listen_lost(self, connection):
+        self._spawn(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._stopping:
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            try:
+                await self._listen()
+            except Exception:
+                logger.warning("Не удалось переподключить LISTEN, повтор")
+                continue
+            # Пока соединения не было, часть событий могла не дойти
+            self._deliver([RESYNC_EVENT])
+            return
+
+    async def stop(self):
+        self._stopping = True
+
+        if self._listen_connection is not None:
+            self._listen_connection.remove_termination_listener(self._on_listen_lost)
+
+        await super().stop()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        for connection in (self._listen_connection, self._notify_connection):
+            if connection is not None:
+                await connection.close()
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            batch = json.loads(payload)
+            if batch == [RESYNC_EVENT] and pid == self._notify_pid:
+                # Свой resync (слишком большое событие или неудачная отправка):
+                # локальные клиенты уже получили события в send/_publish_batch
+                return
+            self._deliver(batch)
+        except Exception:
+            logger.exception("Не удалось обработать уведомление брокера")
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _send(self, batch: list[str]):
+        self._spawn(self._publish_batch(batch))
+
+    async def _publish_batch(self, batch: list[str]):
+        try:
+            await self.send(batch)
+        except PublishError as error:
+            logger.exception("Не удалось опубликовать события через PostgreSQL")
+            # Отправленные части уже дошли до всех, в том числе до своих
+            # клиентов через LISTEN; неотправленные - только локально
+            self._resync_pending = True
+            self._deliver(error.unsent)
+
+    def _chunks(self, batch: list[str]):
+        # Делим пачку так, чтобы каждый NOTIFY уложился в лимит payload
+        chunk, size = [], 2
+        for text in batch:
+            text_size = len(json.dumps(text, ensure_ascii=False).encode()) + 1
+            if chunk and size + text_size > NOTIFY_PAYLOAD_LIMIT:
+                yield chunk
+                chunk, size = [], 2
+            chunk.append(text)
+            size += text_size
+        if chunk:
+            yield chunk
+
+    async def _execute_notify(self, payload: str):
+        if self._notify_connection.is_closed():
+            await self._connect_notify()
+        await self._notify_connection.execute(
+            "SELECT pg_notify($1, $2)", self.channel, payload
+        )
+
+    async def send(self, batch: list[str]):
+        async with self._notify_lock:
+            if self._notify_connection is None:
+                # До start() доставляем хотя бы локально
+                self._deliver(batch)
+                return
+
+            chunks = list(self._chunks(batch))
+            for index, chunk in enumerate(chunks):
+                try:
+                    if self._resync_pending:
+                        await self._execute_notify(json.dumps([RESYNC_EVENT]))
+                        self._resync_pending = False
+
+                    payload = json.dumps(chunk, ensure_ascii=False)
+                    if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+                        # Слишком большое событие: остальным воркерам - сигнал
+                        # пересинхронизации, локальным клиентам - событие целиком
+                        await self._execute_notify(json.dumps([RESYNC_EVENT]))
+                        self._deliver(chunk)
+                    else:
+                        await self._execute_notify(payload)
+                except Exception as error:
+                    unsent = [text for rest in chunks[index:] for text in rest]
+                    raise PublishError(unsent) from error
+
+def create_broker() -> Broker:
+    batch_window = settings.WS_BROKER_BATCH_WINDOW_MS / 1000
+
+    if settings.WS_BROKER == "postgres":
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return PostgresBroker(
+            dsn.render_as_string(hide_password=False),
+            settings.WS_BROKER_CHANNEL,
+            batch_window,
+            settings.WS_BROKER_BATCH_SIZE,
+        )
+
+    return InMemoryBroker(batch_window, settings.WS_BROKER_BATCH_SIZE)
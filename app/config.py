@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,9 +11,89 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
     # SECRET_KEY: str
+
+    # Полный URL вместо DB_* (бенчмарки, отдельные стенды)
+    DB_URL: str | None = None
+
+    # Пул соединений с БД (см. app/database.py)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Кэш подготовленных выражений asyncpg, 0 - для pgbouncer в режиме transaction
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # statement_timeout на стороне сервера, 0 - без ограничения
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+
+    # Реплика для read-only маршрутов (полный URL, как DATABASE_URL). При недоступности
+    # или отставании больше DB_REPLICA_MAX_LAG_SECONDS чтение идёт с основной БД
+    DB_REPLICA_URL: str | None = None
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5
+    DB_REPLICA_CHECK_SECONDS: float = 5
+
+    # Период сверки кэша статистики с БД, секунды
+    STATS_RECONCILE_SECONDS: int = 300
+
+    # Кэш пользователей в get_current_user
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_SIZE: int = 1024
+
+    # Argon2 и пул потоков для хеширования паролей
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE: int = 64
+
+    # Websocket: размер очереди клиента, политика для медленных клиентов
+    # (drop - отбрасывать новые события, coalesce - заменить очередь на resync,
+    # disconnect - отключать) и таймаут отправки
+    WS_QUEUE_SIZE: int = 100
+    WS_SLOW_CONSUMER_POLICY: Literal["drop", "coalesce", "disconnect"] = "coalesce"
+    WS_SEND_TIMEOUT_SECONDS: float = 10
+    # Сколько событий GET /incidents/changes отдаёт за раз; если пропущено
+    # больше, клиент перечитывает данные целиком. События берутся из outbox
+    # и доступны OUTBOX_RETENTION_SECONDS
+    WS_CHANGE_LOG_SIZE: int = 1000
+
+    # Брокер событий между воркерами: memory - один процесс,
+    # postgres - LISTEN/NOTIFY через основную БД
+    WS_BROKER: Literal["memory", "postgres"] = "memory"
+    WS_BROKER_CHANNEL: str = "incident_events"
+    WS_BROKER_BATCH_WINDOW_MS: int = 20
+    WS_BROKER_BATCH_SIZE: int = 100
+
+    # Максимум инцидентов в одном запросе POST /incidents/bulk
+    INGEST_MAX_BATCH: int = 5000
+
+    # Окно подавления повторных тревог (type + location) в POST /incidents/bulk,
+    # 0 - отключено. Ручное создание инцидента повторы не сворачивает
+    DEDUP_WINDOW_SECONDS: int = 300
+    # Переопределения окна: {"тип": секунды} или {"тип:приоритет": секунды}
+    DEDUP_WINDOWS: dict[str, int] = {}
+
+    # Профилирование: доля запросов, профилируемых всегда (0 - только по
+    # X-Profile/?profile=1 от администратора), и сколько самых медленных хранить
+    PROFILE_SAMPLE_RATE: float = 0
+    PROFILE_SLOWEST_KEEP: int = 20
+
+    # Outbox событий: интервал опроса таблицы (на случай событий, не разосланных
+    # до падения или записанных другим воркером), размер пачки и сколько хранить
+    # уже разосланные события
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_RETENTION_SECONDS: int = 3600
+
+    # JSON с таблицами оценки риска (см. app/incidents/risk.py)
+    RISK_RULES_FILE: str | None = None
+    # Как часто воркер проверяет, не сохранена ли новая версия правил в БД
+    RISK_RULES_CHECK_SECONDS: float = 5
     
     @property
     def DATABASE_URL(self) -> str:
+        if self.DB_URL:
+            return self.DB_URL
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
     class Config:
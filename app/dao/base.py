@@ -1,34 +1,84 @@
-from app.database import async_session_maker
-from sqlalchemy import select, insert
+from app.database import use_session
+from sqlalchemy import select, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class BaseDAO:
+    """Запросы к модели через сессию запроса (см. app.database.use_session).
+
+    Записи фиксируются только в сессии, открытой самим DAO; в чужой сессии
+    делается flush, а commit остаётся за вызывающим кодом.
+    """
+
     model = None
 
     @classmethod
-    async def find_by_id(cls, model_id: int):
-        async with async_session_maker() as session:
+    async def find_by_id(cls, model_id: int, session: AsyncSession | None = None):
+        async with use_session(session) as (session, _):
             query = select(cls.model).filter_by(id=model_id)
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
     @classmethod
-    async def find_one_or_none(cls, **filter_by):
-        async with async_session_maker() as session:
+    async def find_many_by_ids(cls, model_ids, session: AsyncSession | None = None):
+        model_ids = list(model_ids)
+        if not model_ids:
+            return []
+
+        async with use_session(session) as (session, _):
+            query = select(cls.model).where(cls.model.id.in_(model_ids))
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    async def find_one_or_none(cls, session: AsyncSession | None = None, **filter_by):
+        async with use_session(session) as (session, _):
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
     @classmethod
-    async def find_all(cls, **filter_by):
-        async with async_session_maker() as session:
+    async def find_all(cls, session: AsyncSession | None = None, **filter_by):
+        async with use_session(session) as (session, _):
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalars().all()
 
     @classmethod
-    async def add(cls, **data):
-        async with async_session_maker() as session:
-            query = insert(cls.model).values(**data)
-            await session.execute(query)
-            await session.commit()
\ No newline at end of file
+    async def _finish(cls, session: AsyncSession, owned: bool):
+        if owned:
+            await session.commit()
+        else:
+            await session.flush()
+
+    @classmethod
+    async def add(cls, session: AsyncSession | None = None, **data):
+        async with use_session(session) as (session, owned):
+            query = insert(cls.model).values(**data).returning(cls.model)
+            result = await session.execute(query)
+            row = result.scalar_one()
+            await cls._finish(session, owned)
+            return row
+
+    @classmethod
+    async def add_many(cls, rows: list[dict], session: AsyncSession | None = None):
+        if not rows:
+            return []
+
+        async with use_session(session) as (session, owned):
+            # Один INSERT ... RETURNING на всю пачку
+            query = insert(cls.model).returning(cls.model, sort_by_parameter_order=True)
+            result = await session.execute(query, rows)
+            created = result.scalars().all()
+            await cls._finish(session, owned)
+            return created
+
+    @classmethod
+    async def update_many(cls, rows: list[dict], session: AsyncSession | None = None):
+        """Обновление по первичному ключу: каждая строка - {"id": ..., поле: значение}."""
+        if not rows:
+            return
+
+        async with use_session(session) as (session, owned):
+            await session.execute(update(cls.model), rows)
+            await cls._finish(session, owned)
@@ -1,15 +1,16 @@
 from app.dao.base import BaseDAO
-from app.models import Incident
-from app.database import async_session_maker
+from app.database import use_session
+from app.incidents.models import Incident
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class IncidentDAO(BaseDAO):
     model = Incident
 
     @classmethod
-    async def find_critical_incidents(cls):
-        async with async_session_maker() as session:
+    async def find_critical_incidents(cls, session: AsyncSession | None = None):
+        async with use_session(session) as (session, _):
             query = select(cls.model).filter_by(priority="высокий")
             result = await session.execute(query)
-            return result.scalars().all()
\ No newline at end of file
+            return result.scalars().all()
@@ -1,16 +1,97 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.monitoring.pool import instrumented_pool, pool_stats, replica_pool_stats
 from typing import AsyncGenerator
 
 # Base для моделей
 Base = declarative_base()
 
+
+def engine_options(url: str, stats=pool_stats) -> dict:
+    options = {
+        "poolclass": instrumented_pool(stats),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    if make_url(url).get_driver_name() == "asyncpg":
+        server_settings = {}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+
+        options["connect_args"] = {
+            # Кэш SQLAlchemy-обёртки и собственный кэш asyncpg
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        }
+
+    return options
+
+
 # Движок и сессии
-engine = create_async_engine(settings.DATABASE_URL)
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+replica_engine = (
+    create_async_engine(
+        settings.DB_REPLICA_URL,
+        **engine_options(settings.DB_REPLICA_URL, replica_pool_stats),
+    )
+    if settings.DB_REPLICA_URL
+    else None
+)
+replica_session_maker = (
+    sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine
+    else None
+)
+
+
+class _RequestSession:
+    __slots__ = ("session",)
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+
+# Сессия текущего запроса: её выставляет get_db, DAO берут её вместо новой.
+# Задачи, созданные из запроса, наследуют контекст, поэтому по окончании
+# запроса очищается сам контейнер, а не переменная.
+current_session: ContextVar[_RequestSession | None] = ContextVar("current_session", default=None)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
-        yield session
+        holder = _RequestSession(session)
+        current_session.set(holder)
+        try:
+            yield session
+        finally:
+            holder.session = None
+
+
+@asynccontextmanager
+async def use_session(session: AsyncSession | None = None) -> AsyncGenerator[tuple[AsyncSession, bool], None]:
+    """Переданная сессия, иначе сессия запроса, иначе новая.
+
+    Второй элемент - True, если сессия открыта здесь и её надо фиксировать самим.
+    """
+    if session is None:
+        holder = current_session.get()
+        session = holder.session if holder else None
+
+    if session is not None:
+        yield session, False
+        return
+
+    async with async_session_maker() as session:
+        yield session, True
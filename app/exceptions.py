@@ -21,4 +21,9 @@ class UserAlreadyExists(IncidentsException):
 
 class UserNotFound(IncidentsException):
     status_code = status.HTTP_404_NOT_FOUND
-    detail = "Пользователь не найден"
\ No newline at end of file
+    detail = "Пользователь не найден"
+
+
+class PasswordHashingBusy(IncidentsException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    detail = "Сервер перегружен, повторите попытку позже"
\ No newline at end of file
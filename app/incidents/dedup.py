@@ -0,0 +1,117 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session_maker
+from app.incidents import models, schemas
+
+
+logger = logging.getLogger(__name__)
+
+
+# Порядок приоритетов в перечислении - от низкого к критическому
+PRIORITY_RANK = {priority.value: rank for rank, priority in enumerate(schemas.IncidentPriority)}
+
+
+def dedup_key(incident_type: str, location: str) -> tuple[str, str]:
+    return incident_type.strip().lower(), " ".join(location.lower().split())
+
+
+def is_escalation(priority: str, current: str | None) -> bool:
+    """Повтор с более высоким приоритетом поднимает приоритет инцидента."""
+    return PRIORITY_RANK.get(priority, -1) > PRIORITY_RANK.get(current, -1)
+
+
+class DedupIndex:
+    """Открытые инциденты по нормализованному (type, location).
+
+    Повтор тревоги в пределах окна складывается в счётчик occurrences
+    существующего инцидента вместо новой записи. Приоритет хранится,
+    чтобы повтор с более высоким приоритетом эскалировал инцидент.
+    """
+
+    def __init__(self, default_window: int, windows: dict[str, int]):
+        self.default_window = default_window
+        # Ключи: "тип" или "тип:приоритет"
+        self.windows = {key.lower(): value for key, value in windows.items()}
+        # ключ -> (id, время последней тревоги, приоритет)
+        self._open: dict[tuple[str, str], tuple[int, float, str]] = {}
+        self._keys: dict[int, tuple[str, str]] = {}
+
+    @property
+    def max_window(self) -> int:
+        return max([self.default_window, *self.windows.values()])
+
+    def window_for(self, incident_type: str, priority: str) -> int:
+        incident_type, priority = incident_type.lower(), priority.lower()
+        window = self.windows.get(f"{incident_type}:{priority}")
+        if window is None:
+            window = self.windows.get(incident_type, self.default_window)
+        return window
+
+    def match(
+        self, incident_type: str, priority: str, location: str, now: float
+    ) -> tuple[int, str] | None:
+        """(id, приоритет) открытого инцидента, в который складывается тревога."""
+        window = self.window_for(incident_type, priority)
+        if window <= 0:
+            return None
+
+        entry = self._open.get(dedup_key(incident_type, location))
+        if entry is None or now - entry[1] > window:
+            return None
+
+        return entry[0], entry[2]
+
+    def remember(
+        self, incident_type: str, location: str, incident_id: int, seen_at: float, priority: str
+    ):
+        key = dedup_key(incident_type, location)
+
+        previous = self._open.get(key)
+        if previous and previous[0] != incident_id:
+            self._keys.pop(previous[0], None)
+
+        self._open[key] = (incident_id, seen_at, priority)
+        self._keys[incident_id] = key
+
+    def forget(self, incident_id: int):
+        key = self._keys.pop(incident_id, None)
+        if key and self._open.get(key, (None,))[0] == incident_id:
+            del self._open[key]
+
+    def load(self, rows):
+        self._open.clear()
+        self._keys.clear()
+
+        # Строки упорядочены по времени: при совпадении ключей остаётся последний
+        for incident_id, incident_type, location, priority, seen_at in rows:
+            if incident_type and location:
+                self.remember(incident_type, location, incident_id, seen_at.timestamp(), priority)
+
+    async def warm(self, db: AsyncSession):
+        incident = models.Incident
+        seen_at = func.coalesce(incident.last_occurred_at, incident.created_at)
+
+        result = await db.execute(
+            select(incident.id, incident.type, incident.location, incident.priority, seen_at)
+            .where(
+                incident.status != schemas.IncidentStatus.CLOSED.value,
+                seen_at >= datetime.now(timezone.utc) - timedelta(seconds=self.max_window),
+            )
+            .order_by(seen_at)
+        )
+        self.load(result.all())
+
+    async def warm_on_startup(self):
+        try:
+            async with async_session_maker() as session:
+                await self.warm(session)
+        except Exception:
+            logger.exception("Не удалось прогреть индекс дедупликации")
+
+
+dedup_index = DedupIndex(settings.DEDUP_WINDOW_SECONDS, settings.DEDUP_WINDOWS)
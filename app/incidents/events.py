@@ -0,0 +1,88 @@
+import json
+
+from fastapi import WebSocket
+from pydantic import ValidationError
+
+from app.brokers import NOTIFY_PAYLOAD_LIMIT
+from app.incidents import schemas
+from app.websocket_manager import manager
+
+
+# Запас на конверт события (seq, type, count) внутри NOTIFY
+EVENT_ENVELOPE_BYTES = 300
+
+
+def handle_subscription_message(websocket: WebSocket, message: str):
+    # {"action": "subscribe", "filters": {"location": [...], "risk_level": [...], ...}}
+    # {"action": "unsubscribe"} - снова получать все события
+    try:
+        data = json.loads(message)
+        action = data.get("action")
+
+        if action == "subscribe":
+            subscription = schemas.IncidentSubscription(**(data.get("filters") or {}))
+        elif action == "unsubscribe":
+            subscription = schemas.IncidentSubscription()
+        else:
+            return
+
+    except (ValueError, TypeError, AttributeError, ValidationError) as error:
+        manager.send_text(
+            websocket,
+            json.dumps(
+                {"type": "error", "payload": {"detail": str(error)}},
+                ensure_ascii=False,
+            ),
+        )
+        return
+
+    filters = subscription.model_dump(mode="json")
+    manager.subscribe(websocket, filters)
+    manager.send_text(
+        websocket,
+        json.dumps({"type": "subscribed", "payload": filters}, ensure_ascii=False),
+    )
+
+
+def event_payload(incident) -> dict:
+    # Полный IncidentResponse, чтобы клиенты применяли изменение без перезапроса
+    # списка; incident_id и поля инцидента используются для маршрутизации подписок
+    payload = schemas.IncidentResponse.model_validate(incident).model_dump(mode="json")
+    payload["incident_id"] = payload["id"]
+    return payload
+
+
+def _notify_size(item: dict) -> int:
+    # В NOTIFY событие лежит строкой внутри JSON-массива: кавычки экранируются ещё раз
+    return len(json.dumps(json.dumps(item, ensure_ascii=False), ensure_ascii=False).encode())
+
+
+def batch_payloads(items: list[dict]) -> list[dict]:
+    """Пакетные события ({"count", "incidents"}), каждое укладывается в один NOTIFY.
+
+    Иначе PostgresBroker заменил бы большое событие на resync, и клиенты
+    всех остальных воркеров разом перечитали бы список и дашборд.
+    """
+    limit = NOTIFY_PAYLOAD_LIMIT - EVENT_ENVELOPE_BYTES
+    batches, chunk, size = [], [], 0
+
+    for item in items:
+        item_size = _notify_size(item)
+        if chunk and size + item_size > limit:
+            batches.append(chunk)
+            chunk, size = [], 0
+        chunk.append(item)
+        size += item_size
+
+    if chunk:
+        batches.append(chunk)
+
+    return [{"count": len(chunk), "incidents": chunk} for chunk in batches]
+
+
+def repeated_payloads(repeated: list[dict]) -> list[dict]:
+    # Повторы шлются пакетными событиями со свежими счётчиками
+    return batch_payloads([
+        {**row, "last_occurred_at": row["last_occurred_at"].isoformat()}
+        for row in repeated
+    ])
@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from app.incidents import models, schemas
+from app.incidents.filters import apply_incident_filters
+from app.incidents.recommendations import get_recommendation
+from app.replica import read_session
+from app.users.models import Users
+
+
+# Строк за одну выборку из серверного курсора
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_COLUMNS = (
+    models.Incident.id,
+    models.Incident.title,
+    models.Incident.description,
+    models.Incident.type,
+    models.Incident.priority,
+    models.Incident.status,
+    models.Incident.location,
+    models.Incident.risk_score,
+    models.Incident.risk_level,
+    models.Incident.occurrences,
+    models.Incident.created_at,
+    models.Incident.closed_at,
+    models.Incident.last_occurred_at,
+    models.Incident.creator_id,
+    Users.name.label("creator_name"),
+)
+
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS] + ["recommendation"]
+
+
+def build_export_query(filters: schemas.IncidentFilters):
+    query = (
+        select(*EXPORT_COLUMNS)
+        .outerjoin(Users, Users.id == models.Incident.creator_id)
+        .order_by(models.Incident.created_at.desc(), models.Incident.id.desc())
+    )
+    return apply_incident_filters(query, filters)
+
+
+def _export_row(row) -> dict:
+    item = row._asdict()
+
+    for field in ("created_at", "closed_at", "last_occurred_at"):
+        if item[field] is not None:
+            item[field] = item[field].isoformat()
+
+    item["recommendation"] = get_recommendation(item["risk_score"] or 0)
+    return item
+
+
+async def _stream_partitions(filters: schemas.IncidentFilters) -> AsyncIterator[list]:
+    # Своя сессия: зависимость get_db закрывается раньше, чем отдан весь ответ
+    async with read_session() as session:
+        result = await session.stream(
+            build_export_query(filters).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+
+async def _csv_chunks(filters: schemas.IncidentFilters) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+
+    # BOM, чтобы Excel открыл кириллицу без выбора кодировки
+    buffer.write("\ufeff")
+    writer.writeheader()
+
+    async for partition in _stream_partitions(filters):
+        writer.writerows(_export_row(row) for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def _ndjson_chunks(filters: schemas.IncidentFilters) -> AsyncIterator[str]:
+    async for partition in _stream_partitions(filters):
+        yield "".join(
+            json.dumps(_export_row(row), ensure_ascii=False) + "\n"
+            for row in partition
+        )
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # wbits=31 - формат gzip, сжатие идёт по мере выгрузки
+    compressor = zlib.compressobj(wbits=31)
+
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+async def _encode(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield chunk.encode("utf-8")
+
+
+def export_incidents(
+    filters: schemas.IncidentFilters,
+    export_format: str,
+    compress: bool,
+) -> AsyncIterator[bytes]:
+    """Поток выгрузки: память не зависит от размера таблицы."""
+    chunks = _csv_chunks(filters) if export_format == "csv" else _ndjson_chunks(filters)
+    body = _encode(chunks)
+
+    return _gzip(body) if compress else body
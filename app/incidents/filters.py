@@ -0,0 +1,28 @@
+from sqlalchemy import Select
+
+from app.incidents import models, schemas
+
+
+def apply_incident_filters(query: Select, filters: schemas.IncidentFilters) -> Select:
+    if filters.status:
+        query = query.where(models.Incident.status == filters.status.value)
+
+    if filters.priority:
+        query = query.where(models.Incident.priority == filters.priority.value)
+
+    if filters.type:
+        query = query.where(models.Incident.type == filters.type.value)
+
+    if filters.risk_level:
+        query = query.where(models.Incident.risk_level == filters.risk_level.value)
+
+    if filters.location:
+        query = query.where(models.Incident.location == filters.location)
+
+    if filters.created_from:
+        query = query.where(models.Incident.created_at >= filters.created_from)
+
+    if filters.created_to:
+        query = query.where(models.Incident.created_at < filters.created_to)
+
+    return query
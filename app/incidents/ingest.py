@@ -0,0 +1,310 @@
+import json
+import time
+from collections import Counter
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import Integer, column, func, insert, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.config import settings
+from app.incidents import models, schemas
+from app.incidents.dedup import dedup_index, dedup_key, is_escalation
+from app.incidents.events import batch_payloads, event_payload, repeated_payloads
+from app.incidents.outbox import add_event
+from app.incidents.recommendations import get_recommendation
+from app.incidents.risk import risk_engine
+from app.incidents.stats_cache import incident_snapshot, stats_delta
+
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+
+
+def _check_size(count: int):
+    if count > settings.INGEST_MAX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Не больше {settings.INGEST_MAX_BATCH} инцидентов за запрос",
+        )
+
+
+async def _read_ndjson(request: Request) -> list:
+    # Поток читается построчно, пустые строки пропускаются
+    items, buffer = [], b""
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        items.extend(line for line in lines if line.strip())
+        _check_size(len(items))
+
+    if buffer.strip():
+        items.append(buffer)
+    _check_size(len(items))
+
+    return items
+
+
+async def read_batch(request: Request) -> tuple[list[schemas.IncidentCreate], list[int], list[dict]]:
+    """Разбирает JSON-массив или NDJSON.
+
+    Возвращает валидные инциденты, их индексы во входных данных и ошибки
+    по остальным элементам.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        raw_items = await _read_ndjson(request)
+    else:
+        try:
+            raw_items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некорректный JSON")
+        if not isinstance(raw_items, list):
+            raise HTTPException(status_code=400, detail="Ожидается массив инцидентов")
+        _check_size(len(raw_items))
+
+    incidents, indexes, errors = [], [], []
+
+    for index, raw_item in enumerate(raw_items):
+        try:
+            if isinstance(raw_item, bytes):
+                raw_item = json.loads(raw_item)
+            if not isinstance(raw_item, dict):
+                raise ValueError("Ожидается объект инцидента")
+            incidents.append(schemas.IncidentCreate(**raw_item))
+            indexes.append(index)
+        except ValidationError as error:
+            errors.append({"index": index, "errors": json.loads(error.json(include_url=False))})
+        except ValueError as error:
+            errors.append({"index": index, "errors": [{"msg": str(error)}]})
+
+    return incidents, indexes, errors
+
+
+async def insert_incidents(
+    db: AsyncSession,
+    incidents: list[schemas.IncidentCreate],
+    creator,
+    occurrences: list[int] | None = None,
+) -> list[dict]:
+    """Вставляет пачку одним INSERT ... RETURNING, риск считается пакетно.
+
+    Транзакцию фиксирует вызывающий код.
+    """
+    if not incidents:
+        return []
+
+    scores = risk_engine.score_many(
+        (incident.type.value, incident.priority.value, incident.location)
+        for incident in incidents
+    )
+
+    rows = [
+        {
+            **incident.model_dump(mode="json"),
+            "creator_id": creator.id,
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "status": schemas.IncidentStatus.OPEN.value,
+            "occurrences": count,
+        }
+        for incident, (risk_score, risk_level), count in zip(
+            incidents, scores, occurrences or [1] * len(incidents)
+        )
+    ]
+
+    table = models.Incident.__table__
+    result = await db.execute(
+        insert(table).returning(
+            table.c.id, table.c.created_at, sort_by_parameter_order=True
+        ),
+        rows,
+    )
+    inserted = result.all()
+
+    creator_info = schemas.UserShortInfo.model_validate(creator).model_dump()
+
+    return [
+        {
+            **row,
+            "id": incident_id,
+            "created_at": created_at,
+            "closed_at": None,
+            "last_occurred_at": None,
+            "recommendation": get_recommendation(row["risk_score"]),
+            "creator": creator_info,
+        }
+        for row, (incident_id, created_at) in zip(rows, inserted)
+    ]
+
+
+async def add_occurrences(db: AsyncSession, repeats: Counter) -> list[dict]:
+    """Увеличивает счётчики повторов одним UPDATE ... FROM (VALUES ...)."""
+    if not repeats:
+        return []
+
+    table = models.Incident.__table__
+    repeat_values = values(
+        column("id", Integer), column("repeats", Integer), name="repeat_values"
+    ).data(list(repeats.items()))
+
+    result = await db.execute(
+        update(table)
+        .where(
+            table.c.id == repeat_values.c.id,
+            # Индекс дедупликации на другом воркере мог не узнать о закрытии:
+            # повтор закрытого инцидента создаётся заново (ветка missing)
+            table.c.status != schemas.IncidentStatus.CLOSED.value,
+        )
+        .values(
+            occurrences=table.c.occurrences + repeat_values.c.repeats,
+            last_occurred_at=func.now(),
+        )
+        .returning(
+            table.c.id,
+            table.c.occurrences,
+            table.c.last_occurred_at,
+            table.c.location,
+            table.c.type,
+            table.c.priority,
+            table.c.risk_level,
+        )
+    )
+    return [
+        {**row._asdict(), "incident_id": row.id}
+        for row in result.all()
+    ]
+
+
+async def escalate_incidents(db: AsyncSession, escalations: dict[int, str]) -> list:
+    """Поднимает приоритет инцидентов, в которые сложились более важные повторы.
+
+    Риск и рекомендация пересчитываются, клиенты получают incident_updated.
+    Транзакцию фиксирует вызывающий код.
+    """
+    if not escalations:
+        return []
+
+    result = await db.execute(
+        select(models.Incident)
+        .options(joinedload(models.Incident.creator))
+        .where(models.Incident.id.in_(escalations))
+    )
+    incidents = result.scalars().all()
+
+    for incident in incidents:
+        before = incident_snapshot(incident)
+
+        incident.priority = escalations[incident.id]
+        incident.risk_score, incident.risk_level = risk_engine.score(
+            incident.type, incident.priority, incident.location
+        )
+        incident.recommendation = get_recommendation(incident.risk_score)
+
+        add_event(
+            db,
+            "incident_updated",
+            event_payload(incident),
+            stats_delta([(before, incident_snapshot(incident))]),
+        )
+
+    return incidents
+
+
+def _fold(incidents, indexes, now: float, skip_ids: set[int]):
+    # Повтор открытого инцидента -> счётчик, повтор внутри пачки -> к первому новому.
+    # Более высокий приоритет повтора не теряется: инцидент эскалируется
+    new, new_positions, repeats, escalations, folded = [], {}, Counter(), {}, []
+
+    for input_index, incident in zip(indexes, incidents):
+        incident_type, priority = incident.type.value, incident.priority.value
+
+        match = dedup_index.match(incident_type, priority, incident.location, now)
+        if match is not None and match[0] not in skip_ids:
+            existing_id, current = match
+            repeats[existing_id] += 1
+            if is_escalation(priority, escalations.get(existing_id, current)):
+                escalations[existing_id] = priority
+            folded.append({"index": input_index, "incident_id": existing_id})
+            continue
+
+        key = dedup_key(incident_type, incident.location)
+        position = new_positions.get(key)
+        if position is not None and dedup_index.window_for(incident_type, priority) > 0:
+            first = new[position]
+            first[2] += 1
+            if is_escalation(priority, first[0].priority.value):
+                first[0] = first[0].model_copy(update={"priority": incident.priority})
+            folded.append({"index": input_index, "new_position": position})
+            continue
+
+        new_positions[key] = len(new)
+        new.append([incident, input_index, 1])
+
+    return new, repeats, escalations, folded
+
+
+async def ingest_incidents(
+    db: AsyncSession,
+    incidents: list[schemas.IncidentCreate],
+    indexes: list[int],
+    creator,
+) -> dict:
+    """Приём пачки тревог с подавлением повторов (см. DedupIndex)."""
+    now = time.time()
+
+    new, repeats, escalations, folded = _fold(incidents, indexes, now, set())
+    repeated = await add_occurrences(db, repeats)
+
+    # Инцидент из индекса мог быть удалён другим воркером - такие тревоги создаём заново
+    missing = set(repeats) - {row["id"] for row in repeated}
+    if missing:
+        for incident_id in missing:
+            dedup_index.forget(incident_id)
+        new, _, escalations, folded = _fold(incidents, indexes, now, missing)
+
+    created = await insert_incidents(
+        db,
+        [incident for incident, _, _ in new],
+        creator,
+        [count for _, _, count in new],
+    )
+    payloads = [event_payload(incident) for incident in created]
+
+    # Несколько инцидентов на событие вместо события на каждый инцидент;
+    # изменение статистики за всю пачку - в первом
+    delta = stats_delta((None, incident_snapshot(incident)) for incident in created)
+    for payload in batch_payloads(payloads):
+        add_event(db, "incidents_created", payload, delta)
+        delta = None
+    for payload in repeated_payloads(repeated):
+        add_event(db, "incidents_repeated", payload)
+
+    escalated = await escalate_incidents(db, escalations)
+
+    await db.commit()
+
+    for incident in created:
+        dedup_index.remember(
+            incident["type"], incident["location"], incident["id"], now, incident["priority"]
+        )
+    priorities = {incident.id: incident.priority for incident in escalated}
+    for row in repeated:
+        dedup_index.remember(
+            row["type"], row["location"], row["id"], now, priorities.get(row["id"], row["priority"])
+        )
+
+    for item in folded:
+        position = item.pop("new_position", None)
+        if position is not None:
+            item["incident_id"] = created[position]["id"]
+
+    return {
+        "created": created,
+        "payloads": payloads,
+        "indexes": [input_index for _, input_index, _ in new],
+        "repeated": repeated,
+        "folded": folded,
+    }
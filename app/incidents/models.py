@@ -1,7 +1,28 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON
+from sqlalchemy import DDL, event, literal_column, text
 from app.database import Base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+import sqlalchemy.dialects.postgresql  # noqa: F401 - регистрирует to_tsvector и т.п. в func
+
+
+# Полнотекстовый поиск по title/description/location. Выражение собрано из
+# литералов, а не параметров, чтобы запросы совпадали с индексом ix_incidents_search.
+SEARCH_CONFIG = text("'russian'")
+
+
+def search_document(title, description, location):
+    def part(column):
+        return func.coalesce(column, literal_column("''"))
+
+    document = (
+        part(title)
+        .concat(literal_column("' '"))
+        .concat(part(description))
+        .concat(literal_column("' '"))
+        .concat(part(location))
+    )
+    return func.to_tsvector(SEARCH_CONFIG, document)
 
 
 class Incident(Base):
@@ -22,7 +43,109 @@ class Incident(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     closed_at = Column(DateTime(timezone=True), nullable=True)
 
+    # Повторные тревоги, свёрнутые в этот инцидент (см. app/incidents/dedup.py)
+    occurrences = Column(Integer, nullable=False, default=1, server_default="1")
+    last_occurred_at = Column(DateTime(timezone=True), nullable=True)
+
     creator = relationship("Users", back_populates="incidents")
 
+    # Индексы под keyset-пагинацию (created_at, id) и фильтры списка
+    __table_args__ = (
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+        Index("ix_incidents_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_incidents_priority_created_at_id", "priority", "created_at", "id"),
+        Index("ix_incidents_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_incidents_risk_level_created_at_id", "risk_level", "created_at", "id"),
+        Index("ix_incidents_location_created_at_id", "location", "created_at", "id"),
+        Index(
+            "ix_incidents_search",
+            search_document(title, description, location),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     # def __str__(self):
-    #     return f"Инцидент {self.title}"
\ No newline at end of file
+    #     return f"Инцидент {self.title}"
+
+
+def incident_search_document():
+    return search_document(Incident.title, Incident.description, Incident.location)
+
+
+# Нечёткий поиск по локации (similarity и ILIKE '%...%') через pg_trgm
+Index(
+    "ix_incidents_location_trgm",
+    Incident.location,
+    postgresql_using="gin",
+    postgresql_ops={"location": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+event.listen(
+    Incident.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+class RiskRuleSet(Base):
+    """Версии таблиц оценки риска; действует последняя запись."""
+
+    __tablename__ = "risk_rule_sets"
+
+    id = Column(Integer, primary_key=True)
+    rules = Column(JSON, nullable=False)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RiskRecalculationJob(Base):
+    """Фоновые пересчёты рисков (app/incidents/recalculation.py).
+
+    Состояние хранится в БД, чтобы опрос статуса работал на любом воркере.
+    """
+
+    __tablename__ = "risk_recalculation_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class OutboxEvent(Base):
+    """События для websocket-клиентов, записанные в одной транзакции с изменением.
+
+    Рассылает их OutboxDispatcher (app/incidents/outbox.py) после commit.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    dispatched_at = Column(DateTime(timezone=True), nullable=True)
+    # Номер в порядке рассылки, общий для всех воркеров (seq у клиентов).
+    # id выдаётся при INSERT, а транзакции коммитятся в другом порядке,
+    # поэтому для догоняющих клиентов он не годится
+    dispatch_seq = Column(BigInteger, nullable=True)
+    # Изменение агрегатов статистики (stats_cache.stats_delta); диспетчер
+    # рассылает его воркерам вместе с событием
+    stats_delta = Column(JSON(none_as_null=True), nullable=True)
+
+    # Диспетчер выбирает только неразосланные события, по порядку id
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_pending",
+            "id",
+            postgresql_where=text("dispatched_at IS NULL"),
+            sqlite_where=text("dispatched_at IS NULL"),
+        ),
+        Index("ix_outbox_events_dispatched_at", "dispatched_at"),
+        Index("ix_outbox_events_dispatch_seq", "dispatch_seq", unique=True),
+    )
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import async_session_maker
+from app.incidents import models
+from app.websocket_manager import manager, serialize_event, serialize_internal
+
+
+logger = logging.getLogger(__name__)
+
+# Удаление старых разосланных событий - не чаще раза в минуту
+PURGE_INTERVAL_SECONDS = 60
+
+# Ключ pg_advisory_xact_lock: пачки рассылаются по одной, чтобы номера
+# dispatch_seq шли в порядке рассылки
+DISPATCH_LOCK_KEY = 250_011
+
+def add_event(db: AsyncSession, event_type: str, payload: dict, stats_delta: dict | None = None):
+    """Событие уйдёт клиентам, только если закоммитится транзакция db.
+
+    После commit нужно вызвать outbox_dispatcher.notify(), иначе событие
+    разошлётся при следующем опросе таблицы. stats_delta применят к кэшу
+    статистики все воркеры.
+    """
+    db.add(models.OutboxEvent(event_type=event_type, payload=payload, stats_delta=stats_delta))
+
+
+async def changes_since(
+    db: AsyncSession,
+    since: int | None,
+    limit: int = settings.WS_CHANGE_LOG_SIZE,
+) -> tuple[bool, int, list[str]]:
+    """(reset, seq, события после since) для догоняющих клиентов.
+
+    Номер события - dispatch_seq, общий для всех воркеров и выдаваемый в
+    порядке рассылки, поэтому ответ не зависит от того, какой воркер держит
+    websocket клиента, и событие не может появиться позади уже отданного.
+    reset - часть событий уже удалена или их больше limit.
+    """
+    event = models.OutboxEvent
+
+    latest = (await db.execute(select(func.max(event.dispatch_seq)))).scalar() or 0
+
+    if since is None:
+        return False, latest, []
+
+    if since > latest:
+        # База пересоздана или клиент пришёл с чужим номером
+        return True, latest, []
+
+    if since == latest:
+        return False, latest, []
+
+    if since > 0:
+        # Удаляется префикс номеров: если не осталось ни одного события до
+        # since, следующие за ним могли быть удалены
+        kept = await db.execute(
+            select(event.dispatch_seq).where(event.dispatch_seq <= since).limit(1)
+        )
+        if kept.scalar() is None:
+            return True, latest, []
+
+    result = await db.execute(
+        select(event.dispatch_seq, event.event_type, event.payload)
+        .where(event.dispatch_seq > since)
+        .order_by(event.dispatch_seq)
+        .limit(limit + 1)
+    )
+    rows = result.all()
+
+    if len(rows) > limit:
+        return True, latest, []
+
+    changes = [serialize_event(row.event_type, row.payload, row.dispatch_seq) for row in rows]
+    return False, rows[-1].dispatch_seq if rows else since, changes
+
+
+class OutboxDispatcher:
+    """Фоновая рассылка событий из outbox_events.
+
+    Запрос только пишет событие в своей транзакции и будит диспетчер;
+    websocket-рассылка идёт уже вне запроса. Событие помечается
+    разосланным в той же транзакции только после того, как брокер его
+    отправил: если отправка не удалась, транзакция откатывается и пачка
+    остаётся в очереди. При падении между отправкой и commit событие
+    уйдёт повторно (at-least-once), но не потеряется.
+
+    Пачки рассылаются строго по одной (pg_advisory_xact_lock до commit),
+    и каждое событие получает следующий dispatch_seq: клиенты видят номера
+    в порядке рассылки, даже если транзакции запросов коммитились не по
+    порядку id.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float, retention: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._wakeup = asyncio.Event()
+        self._last_purge = 0.0
+        self.dispatched = 0
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def dispatch_batch(self) -> int:
+        async with async_session_maker() as session:
+            if session.bind.dialect.name == "postgresql":
+                await session.execute(select(func.pg_advisory_xact_lock(DISPATCH_LOCK_KEY)))
+
+            result = await session.execute(
+                select(models.OutboxEvent)
+                .where(models.OutboxEvent.dispatched_at.is_(None))
+                .order_by(models.OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+
+            # Под блокировкой max не изменится до нашего commit
+            last_seq = (
+                await session.execute(select(func.max(models.OutboxEvent.dispatch_seq)))
+            ).scalar() or 0
+            for number, event in enumerate(events, start=last_seq + 1):
+                event.dispatch_seq = number
+                event.dispatched_at = func.now()
+            await session.flush()
+
+            messages = []
+            for event in events:
+                messages.append(serialize_event(event.event_type, event.payload, event.dispatch_seq))
+                if event.stats_delta:
+                    messages.append(serialize_internal("stats", {
+                        "seq": event.dispatch_seq,
+                        "id": event.id,
+                        "delta": event.stats_delta,
+                    }))
+
+            # Ждём фактической отправки; PublishError откатит транзакцию
+            await manager.publish(messages)
+            await session.commit()
+
+        self.dispatched += len(events)
+        return len(events)
+
+    async def purge(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+        event = models.OutboxEvent
+
+        async with async_session_maker() as session:
+            # Удаляется префикс номеров (changes_since на это рассчитывает);
+            # последнее событие остаётся, чтобы нумерация не началась заново
+            boundary = (
+                await session.execute(
+                    select(func.max(event.dispatch_seq)).where(event.dispatched_at < cutoff)
+                )
+            ).scalar()
+            latest = (await session.execute(select(func.max(event.dispatch_seq)))).scalar()
+            if boundary is None:
+                return
+
+            await session.execute(
+                delete(event).where(
+                    event.dispatch_seq <= boundary,
+                    event.dispatch_seq < latest,
+                )
+            )
+            await session.commit()
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+
+            try:
+                count = await self.dispatch_batch()
+            except Exception:
+                logger.exception("Не удалось разослать события outbox")
+                count = 0
+
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self._last_purge = time.monotonic()
+                try:
+                    await self.purge()
+                except Exception:
+                    logger.exception("Не удалось удалить старые события outbox")
+
+            # Полная пачка - в таблице, скорее всего, есть ещё
+            if count >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self):
+        # При остановке: разослать то, что успели закоммитить запросы
+        while await self.dispatch_batch() >= self.batch_size:
+            pass
+
+
+outbox_dispatcher = OutboxDispatcher(
+    settings.OUTBOX_BATCH_SIZE,
+    settings.OUTBOX_POLL_SECONDS,
+    settings.OUTBOX_RETENTION_SECONDS,
+)
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+
+from app.incidents import models
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, incident_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), incident_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, incident_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(incident_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def paginate_incidents(query: Select, cursor: str | None, limit: int) -> Select:
+    # Keyset-пагинация по (created_at, id): новые инциденты первыми,
+    # страница читается по индексу без OFFSET.
+    if cursor:
+        created_at, incident_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(models.Incident.created_at, models.Incident.id)
+            < tuple_(created_at, incident_id)
+        )
+
+    return query.order_by(
+        models.Incident.created_at.desc(),
+        models.Incident.id.desc(),
+    ).limit(limit + 1)
+
+
+def build_page(incidents: list, limit: int) -> dict:
+    next_cursor = None
+
+    if len(incidents) > limit:
+        incidents = incidents[:limit]
+        last = incidents[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return {"items": incidents, "next_cursor": next_cursor}
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import Integer, String, column, delete, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.incidents import models
+from app.incidents.risk import risk_engine
+from app.incidents.stats_cache import broadcast_rebuild
+
+
+logger = logging.getLogger(__name__)
+
+# Сколько различных комбинаций (type, priority, location) обновлять одним UPDATE
+RECALCULATION_BATCH_SIZE = 500
+MAX_STORED_JOBS = 20
+
+JOB_FIELDS = ("status", "total", "processed", "updated", "error", "started_at", "finished_at")
+
+
+class RecalculationJob:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "pending"
+        self.total = 0
+        self.processed = 0
+        self.updated = 0
+        self.error: str | None = None
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        # Фоновая задача: прогресс сохраняется в risk_recalculation_jobs
+        self.stored = False
+
+
+# Ссылки на запущенные задачи, чтобы их не собрал сборщик мусора
+_tasks: set[asyncio.Task] = set()
+
+
+async def save_job(db: AsyncSession, job: RecalculationJob):
+    """Записывает состояние задачи; транзакцию фиксирует вызывающий код."""
+    await db.merge(
+        models.RiskRecalculationJob(
+            id=job.id, **{field: getattr(job, field) for field in JOB_FIELDS}
+        )
+    )
+
+
+async def load_job(db: AsyncSession, job_id: str) -> dict | None:
+    """Состояние задачи с любого воркера.
+
+    Если воркер, выполнявший задачу, упал, она так и останется в "running".
+    """
+    row = await db.get(models.RiskRecalculationJob, job_id)
+    if row is None:
+        return None
+    return {"job_id": row.id, **{field: getattr(row, field) for field in JOB_FIELDS}}
+
+
+def _values_table(rows: list[tuple]):
+    return values(
+        column("type", String),
+        column("priority", String),
+        column("location", String),
+        column("risk_score", Integer),
+        column("risk_level", String),
+        name="risk_values",
+    ).data(rows)
+
+
+def _equals(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _score_changed(risk_score, risk_level):
+    # Не трогаем строки, у которых оценка не изменилась
+    incident = models.Incident
+    return (
+        incident.risk_score.is_distinct_from(risk_score)
+        | incident.risk_level.is_distinct_from(risk_level)
+    )
+
+
+async def recalculate_risks_bulk(db: AsyncSession, job: RecalculationJob) -> int:
+    """Пересчитывает риски пачками UPDATE ... FROM (VALUES ...).
+
+    Оценка считается один раз на каждую различную комбинацию
+    (type, priority, location), каждая пачка коммитится отдельно.
+    """
+    incident = models.Incident
+
+    result = await db.execute(
+        select(incident.type, incident.priority, incident.location).group_by(
+            incident.type, incident.priority, incident.location
+        )
+    )
+    combinations = result.all()
+
+    job.total = len(combinations)
+    if job.stored:
+        await save_job(db, job)
+    await db.commit()
+
+    for start in range(0, len(combinations), RECALCULATION_BATCH_SIZE):
+        batch = combinations[start : start + RECALCULATION_BATCH_SIZE]
+
+        scores = risk_engine.score_many(
+            (incident_type or "", priority or "", location or "")
+            for incident_type, priority, location in batch
+        )
+        rows = [
+            (*combination, risk_score, risk_level)
+            for combination, (risk_score, risk_level) in zip(batch, scores)
+        ]
+
+        # Комбинации без NULL соединяются по "=" (hash join по индексам);
+        # IS NOT DISTINCT FROM на всех строках давал nested loop
+        complete = [row for row in rows if None not in row[:3]]
+        partial = [row for row in rows if None in row[:3]]
+
+        updated = 0
+        if complete:
+            risk_values = _values_table(complete)
+            result = await db.execute(
+                update(incident)
+                .where(
+                    incident.type == risk_values.c.type,
+                    incident.priority == risk_values.c.priority,
+                    incident.location == risk_values.c.location,
+                    _score_changed(risk_values.c.risk_score, risk_values.c.risk_level),
+                )
+                .values(
+                    risk_score=risk_values.c.risk_score,
+                    risk_level=risk_values.c.risk_level,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+
+        # Комбинации с NULL редки - по отдельному UPDATE на каждую
+        for incident_type, priority, location, risk_score, risk_level in partial:
+            result = await db.execute(
+                update(incident)
+                .where(
+                    _equals(incident.type, incident_type),
+                    _equals(incident.priority, priority),
+                    _equals(incident.location, location),
+                    _score_changed(risk_score, risk_level),
+                )
+                .values(risk_score=risk_score, risk_level=risk_level)
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+
+        job.updated += updated
+        job.processed += len(batch)
+
+        # Прогресс фиксируется вместе с пачкой
+        if job.stored:
+            await save_job(db, job)
+        await db.commit()
+
+    return job.updated
+
+
+async def run_job(job: RecalculationJob):
+    job.status = "running"
+    job.started_at = datetime.now(timezone.utc)
+
+    try:
+        async with async_session_maker() as session:
+            await save_job(session, job)
+            await session.commit()
+            await recalculate_risks_bulk(session, job)
+        await broadcast_rebuild()
+        job.status = "finished"
+    except Exception as error:
+        logger.exception("Ошибка пересчёта рисков")
+        job.status = "failed"
+        job.error = str(error)
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+
+    try:
+        async with async_session_maker() as session:
+            await save_job(session, job)
+            await session.commit()
+    except Exception:
+        logger.exception("Не удалось сохранить состояние пересчёта рисков %s", job.id)
+
+
+async def start_job(db: AsyncSession) -> RecalculationJob:
+    job = RecalculationJob()
+    job.stored = True
+
+    await save_job(db, job)
+
+    # Завершённые задачи хранятся, пока они среди последних MAX_STORED_JOBS
+    table = models.RiskRecalculationJob
+    recent = select(table.id).order_by(table.created_at.desc()).limit(MAX_STORED_JOBS)
+    await db.execute(
+        delete(table).where(
+            table.status.in_(("finished", "failed")),
+            table.id.not_in(recent),
+        )
+    )
+    await db.commit()
+
+    task = asyncio.create_task(run_job(job))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
@@ -1,12 +1,10 @@
-def calculate_risk(
-    incident_type: str,
-    priority: str,
-    location: str,
-):
-    score = 0
+from functools import lru_cache
+from typing import Iterable
 
+
+DEFAULT_RISK_RULES = {
     # Тип инцидента
-    type_scores = {
+    "type_scores": {
         "утечка": 60,
         "отказ оборудования": 50,
         "коррозия": 35,
@@ -14,45 +12,117 @@ def calculate_risk(
         "загазованность": 70,
         "сбой автоматики": 45,
         "другое": 20,
-    }
-
-    score += type_scores.get(incident_type.lower(), 10)
-
+    },
+    "default_type_score": 10,
     # Приоритет
-    priority_scores = {
+    "priority_scores": {
         "низкий": 10,
         "средний": 20,
         "высокий": 40,
         "критический": 60,
-    }
-
-    score += priority_scores.get(priority.lower(), 10)
-
-    # Локация
-    location_scores = {
-        "резервуар": 30,
-        "насосная": 20,
-        "склад": 10,
-    }
-
-    location_lower = location.lower()
-
-    if "упн" in location_lower:
-        score += 25
-    elif "цех" in location_lower:
-        score += 20
-    elif "резервуар" in location_lower:
-        score += 30
-    elif "насос" in location_lower:
-        score += 20
-    else:
-        score += 10
-
-    if score <= 40:
-        level = "LOW"
-    elif score <= 80:
-        level = "MEDIUM"
-    else:
-        level = "HIGH"
-
-    return score, level
+    },
+    "default_priority_score": 10,
+    # Локация: подстроки проверяются по порядку, срабатывает первая
+    "location_scores": [
+        {"pattern": "упн", "score": 25},
+        {"pattern": "цех", "score": 20},
+        {"pattern": "резервуар", "score": 30},
+        {"pattern": "насос", "score": 20},
+    ],
+    "default_location_score": 10,
+    # Границы уровней: score <= low_threshold -> LOW, <= medium_threshold -> MEDIUM
+    "low_threshold": 40,
+    "medium_threshold": 80,
+}
+
+RISK_CACHE_SIZE = 4096
+
+
+def risk_key(incident_type: str, priority: str, location: str) -> tuple[str, str, str]:
+    # Ключ кэша нормализован: "УПН-1 " и "упн-1" - одна запись
+    return incident_type.strip().lower(), priority.strip().lower(), location.strip().lower()
+
+
+class RiskEngine:
+    """Скомпилированные таблицы оценки риска с LRU-кэшем результатов."""
+
+    def __init__(self, rules: dict | None = None, cache_size: int = RISK_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.load(rules or DEFAULT_RISK_RULES)
+
+    def load(self, rules: dict, version: int | None = None):
+        self.rules = rules
+        # id записи RiskRuleSet, из которой загружены правила (None - файл или умолчания)
+        self.version = version
+
+        self._type_scores = {
+            key.strip().lower(): value for key, value in rules["type_scores"].items()
+        }
+        self._default_type_score = rules["default_type_score"]
+
+        self._priority_scores = {
+            key.strip().lower(): value for key, value in rules["priority_scores"].items()
+        }
+        self._default_priority_score = rules["default_priority_score"]
+
+        self._location_scores = tuple(
+            (rule["pattern"].lower(), rule["score"]) for rule in rules["location_scores"]
+        )
+        self._default_location_score = rules["default_location_score"]
+
+        self._low_threshold = rules["low_threshold"]
+        self._medium_threshold = rules["medium_threshold"]
+
+        # Новый кэш на каждую версию правил
+        self._cached_score = lru_cache(maxsize=self.cache_size)(self._compute)
+
+    def _compute(self, incident_type: str, priority: str, location: str) -> tuple[int, str]:
+        # Аргументы уже нормализованы risk_key
+        score = self._type_scores.get(incident_type, self._default_type_score)
+        score += self._priority_scores.get(priority, self._default_priority_score)
+
+        for pattern, location_score in self._location_scores:
+            if pattern in location:
+                score += location_score
+                break
+        else:
+            score += self._default_location_score
+
+        if score <= self._low_threshold:
+            level = "LOW"
+        elif score <= self._medium_threshold:
+            level = "MEDIUM"
+        else:
+            level = "HIGH"
+
+        return score, level
+
+    def score(self, incident_type: str, priority: str, location: str) -> tuple[int, str]:
+        return self._cached_score(*risk_key(incident_type, priority, location))
+
+    def score_many(self, items: Iterable[tuple[str, str, str]]) -> list[tuple[int, str]]:
+        # Каждая различная комбинация считается один раз на пачку
+        computed = {}
+        scores = []
+
+        for key in items:
+            result = computed.get(key)
+            if result is None:
+                result = computed[key] = self._cached_score(*risk_key(*key))
+            scores.append(result)
+
+        return scores
+
+    def cache_info(self):
+        return self._cached_score.cache_info()
+
+
+risk_engine = RiskEngine()
+
+
+def calculate_risk(
+    incident_type: str,
+    priority: str,
+    location: str,
+):
+    return risk_engine.score(incident_type, priority, location)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session_maker
+from app.incidents import models, schemas
+from app.incidents.risk import DEFAULT_RISK_RULES, risk_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_rules_file(path: str) -> dict:
+    with open(path, encoding="utf-8") as rules_file:
+        return schemas.RiskRules(**json.load(rules_file)).model_dump()
+
+
+async def load_latest_rule_set(db: AsyncSession) -> models.RiskRuleSet | None:
+    result = await db.execute(
+        select(models.RiskRuleSet)
+        .order_by(models.RiskRuleSet.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def latest_rules_version(db: AsyncSession) -> int | None:
+    result = await db.execute(select(func.max(models.RiskRuleSet.id)))
+    return result.scalar()
+
+
+async def save_rules(db: AsyncSession, rules: schemas.RiskRules, user_id: int) -> dict:
+    data = rules.model_dump()
+
+    rule_set = models.RiskRuleSet(rules=data, created_by=user_id)
+    db.add(rule_set)
+    await db.commit()
+
+    # Остальные воркеры подхватят новую версию в run_rules_refresh
+    risk_engine.load(data, rule_set.id)
+    return data
+
+
+async def refresh_risk_engine():
+    async with async_session_maker() as session:
+        version = await latest_rules_version(session)
+        if version is None or version == risk_engine.version:
+            return
+
+        rule_set = await load_latest_rule_set(session)
+
+    logger.info("Загружена новая версия правил оценки риска: %s", rule_set.id)
+    risk_engine.load(rule_set.rules, rule_set.id)
+
+
+async def run_rules_refresh(interval: float):
+    # Правила меняются через PUT /incidents/risk-rules на одном воркере;
+    # остальные сверяют id последней версии в БД
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_risk_engine()
+        except Exception:
+            logger.exception("Не удалось проверить версию правил оценки риска")
+
+
+async def init_risk_engine():
+    # Приоритет: правила из БД, затем файл RISK_RULES_FILE, затем значения по умолчанию
+    rules, version = DEFAULT_RISK_RULES, None
+
+    if settings.RISK_RULES_FILE:
+        rules = load_rules_file(settings.RISK_RULES_FILE)
+
+    try:
+        async with async_session_maker() as session:
+            rule_set = await load_latest_rule_set(session)
+        if rule_set is not None:
+            rules, version = rule_set.rules, rule_set.id
+    except Exception:
+        logger.exception("Не удалось загрузить правила оценки риска из БД")
+
+    risk_engine.load(rules, version)
@@ -1,20 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+import time
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 from app.database import get_db
+from app.replica import get_read_db
 from app.incidents import models, schemas
-from app.users.dependencies import get_current_user
-from app.incidents.risk import calculate_risk
+from app.users.dependencies import get_current_user, get_token_user
+from app.incidents.risk import risk_engine
+from app.incidents.risk_rules import save_rules
+from app.incidents.recalculation import (
+    RecalculationJob,
+    load_job,
+    recalculate_risks_bulk,
+    start_job,
+)
 from app.users.permissions import require_master_or_admin, require_admin
 from app.incidents.recommendations import get_recommendation
-from datetime import datetime
+from app.incidents.filters import apply_incident_filters
+from app.incidents.export import EXPORT_MEDIA_TYPES, export_incidents
+from app.incidents.dedup import dedup_index
+from app.incidents.ingest import ingest_incidents, insert_incidents, read_batch
+from app.incidents.search import build_search_query
+from app.incidents.serialization import (
+    incident_row_to_dict,
+    json_response,
+    select_incident_rows,
+)
+from app.incidents.stats import (
+    build_breakdown,
+    build_dashboard,
+    build_resolution,
+    build_stats,
+)
+from app.incidents.stats_cache import (
+    broadcast_rebuild,
+    incident_snapshot,
+    stats_cache,
+    stats_delta,
+)
+from app.incidents.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    build_page,
+    paginate_incidents,
+)
+from datetime import datetime, timezone
+from app.incidents.events import event_payload, handle_subscription_message
+from app.incidents.outbox import add_event, changes_since, outbox_dispatcher
+from app.response_cache import (
+    STATIC_CACHE_CONTROL,
+    conditional_response,
+    render,
+    response_cache,
+)
 from app.websocket_manager import manager
 
 
 router = APIRouter(prefix="/incidents", tags=["Incidents"])
 
 
+# Справочники строятся из перечислений один раз при импорте
+REFERENCE_TYPES = render([item.value for item in schemas.IncidentType])
+REFERENCE_PRIORITIES = render([item.value for item in schemas.IncidentPriority])
+
+STATS_ADAPTER = TypeAdapter(schemas.IncidentStats)
+DASHBOARD_ADAPTER = TypeAdapter(schemas.DashboardResponse)
+LOCATION_STATS_ADAPTER = TypeAdapter(list[schemas.LocationStats])
+TYPE_STATS_ADAPTER = TypeAdapter(list[schemas.IncidentTypeStats])
+RESOLUTION_ADAPTER = TypeAdapter(schemas.ResolutionStats)
+RISK_DISTRIBUTION_ADAPTER = TypeAdapter(list[schemas.RiskDistributionStats])
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
 
@@ -23,228 +84,213 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
 
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive_text()
+            handle_subscription_message(websocket, message)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
 
-@router.get("/", response_model=list[schemas.IncidentResponse])
+@router.get("/", response_model=schemas.IncidentPage)
 async def get_all_incidents(
-    db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)
+    filters: schemas.IncidentFilters = Depends(),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_token_user),
 ):
-    result = await db.execute(
-        select(models.Incident).options(joinedload(models.Incident.creator))
-    )
-    incidents = result.scalars().all()
+    query = apply_incident_filters(select_incident_rows(), filters)
+    query = paginate_incidents(query, cursor, limit)
 
-    response = []
+    result = await db.execute(query)
+    page = build_page(result.all(), limit)
+    page["items"] = [incident_row_to_dict(row) for row in page["items"]]
 
-    for incident in incidents:
+    return json_response(page)
 
-        incident.recommendation = get_recommendation(incident.risk_score)
 
-        response.append(incident)
+@router.get("/export")
+async def export_incidents_stream(
+    filters: schemas.IncidentFilters = Depends(),
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    gzip: bool = False,
+    current_user=Depends(get_token_user),
+):
+    filename = f"incidents.{export_format}"
+    media_type = EXPORT_MEDIA_TYPES[export_format]
 
-    return response
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
 
+    return StreamingResponse(
+        export_incidents(filters, export_format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-@router.get("/stats", response_model=schemas.IncidentStats)
-async def get_incident_stats(
-    db: AsyncSession = Depends(get_db),
-    current_user=Depends(get_current_user),
-):
-    total = await db.scalar(select(func.count(models.Incident.id)))
 
-    open_count = await db.scalar(
-        select(func.count(models.Incident.id)).where(models.Incident.status == "открыт")
+async def cached_stats(request: Request, build, adapter: TypeAdapter) -> Response:
+    # Ответы /stats* меняются только вместе с агрегатами: ETag + 304 без пересборки
+    aggregates = await stats_cache.get()
+    return response_cache.respond(
+        request, stats_cache.version, lambda: build(aggregates), adapter
     )
 
-    in_progress_count = await db.scalar(
-        select(func.count(models.Incident.id)).where(
-            models.Incident.status == "в работе"
-        )
-    )
 
-    closed_count = await db.scalar(
-        select(func.count(models.Incident.id)).where(models.Incident.status == "закрыт")
-    )
+@router.get("/stats", response_model=schemas.IncidentStats)
+async def get_incident_stats(request: Request, current_user=Depends(get_token_user)):
+    return await cached_stats(request, build_stats, STATS_ADAPTER)
 
-    avg_risk = await db.scalar(select(func.avg(models.Incident.risk_score)))
 
-    return {
-        "total": total or 0,
-        "open": open_count or 0,
-        "in_progress": in_progress_count or 0,
-        "closed": closed_count or 0,
-        "average_risk": round(avg_risk or 0, 2),
-    }
+@router.get("/dashboard", response_model=schemas.DashboardResponse)
+async def get_dashboard(request: Request, current_user=Depends(get_token_user)):
+    return await cached_stats(request, build_dashboard, DASHBOARD_ADAPTER)
 
 
-@router.get("/stats/locations", response_model=list[schemas.LocationStats])
-async def get_top_locations(
+@router.get("/changes")
+async def get_changes(
+    since: int | None = Query(None, ge=0),
     db: AsyncSession = Depends(get_db),
-    current_user=Depends(get_current_user),
+    current_user=Depends(get_token_user),
 ):
-    result = await db.execute(
-        select(models.Incident.location, func.count(models.Incident.id).label("count"))
-        .group_by(models.Incident.location)
-        .order_by(func.count(models.Incident.id).desc())
+    # Без since - только текущий номер, с которого клиент начнёт отсчёт
+    reset, seq, changes = await changes_since(db, since)
+
+    # События уже сериализованы, ответ собирается без повторной сериализации
+    body = (
+        f'{{"seq": {seq}, "reset": {"true" if reset else "false"}, '
+        f'"changes": [{", ".join(changes)}]}}'
     )
+    return Response(content=body, media_type="application/json")
 
-    rows = result.all()
 
-    return [
-        {
-            "location": row.location,
-            "count": row.count,
-        }
-        for row in rows
-    ]
+@router.get("/stats/locations", response_model=list[schemas.LocationStats])
+async def get_top_locations(request: Request, current_user=Depends(get_token_user)):
+    return await cached_stats(
+        request,
+        lambda aggregates: build_breakdown(aggregates, "location"),
+        LOCATION_STATS_ADAPTER,
+    )
 
 
 @router.get(
     "/stats/types",
     response_model=list[schemas.IncidentTypeStats],
 )
-async def get_top_incident_types(
-    db: AsyncSession = Depends(get_db),
-    current_user=Depends(get_current_user),
-):
-    result = await db.execute(
-        select(
-            models.Incident.type,
-            func.count(models.Incident.id).label("count"),
-        )
-        .group_by(models.Incident.type)
-        .order_by(func.count(models.Incident.id).desc())
+async def get_top_incident_types(request: Request, current_user=Depends(get_token_user)):
+    return await cached_stats(
+        request,
+        lambda aggregates: build_breakdown(aggregates, "type"),
+        TYPE_STATS_ADAPTER,
     )
 
-    rows = result.all()
 
-    return [
-        {
-            "type": row.type,
-            "count": row.count,
-        }
-        for row in rows
-    ]
+@router.get("/stats/consistency")
+async def check_stats_consistency(current_user=Depends(get_current_user)):
+    require_admin(current_user)
 
+    return await stats_cache.check()
 
-@router.get("/reference/types")
-async def get_incident_types():
-    return [
-        "утечка",
-        "отказ оборудования",
-        "коррозия",
-        "пожарная опасность",
-        "загазованность",
-        "сбой автоматики",
-        "другое",
-    ]
 
+@router.post("/stats/rebuild")
+async def rebuild_stats(current_user=Depends(get_current_user)):
+    require_admin(current_user)
+
+    await stats_cache.rebuild()
 
-@router.get("/reference/priorities")
-async def get_priorities():
-    return [
-        "низкий",
-        "средний",
-        "высокий",
-        "критический",
-    ]
+    return {
+        "message": "Статистика пересобрана",
+        "rebuilt_at": stats_cache.rebuilt_at,
+    }
+
+
+@router.get("/reference/types", response_model=list[str])
+async def get_incident_types(request: Request):
+    return conditional_response(request, REFERENCE_TYPES, STATIC_CACHE_CONTROL)
+
+
+@router.get("/reference/priorities", response_model=list[str])
+async def get_priorities(request: Request):
+    return conditional_response(request, REFERENCE_PRIORITIES, STATIC_CACHE_CONTROL)
 
 
 @router.get(
     "/stats/resolution-time",
     response_model=schemas.ResolutionStats,
 )
-async def get_resolution_time_stats(
-    db: AsyncSession = Depends(get_db),
-    current_user=Depends(get_current_user),
-):
-    result = await db.execute(
-        select(
-            func.avg(
-                func.extract(
-                    "epoch",
-                    models.Incident.closed_at - models.Incident.created_at,
-                )
-            )
-        ).where(models.Incident.closed_at.is_not(None))
-    )
-
-    avg_seconds = result.scalar()
-
-    if not avg_seconds:
-        return {"average_hours": 0}
-
-    return {
-        "average_hours": round(
-            avg_seconds / 3600,
-            2,
-        )
-    }
+async def get_resolution_time_stats(request: Request, current_user=Depends(get_token_user)):
+    return await cached_stats(request, build_resolution, RESOLUTION_ADAPTER)
 
 
 @router.get(
     "/stats/risk-distribution",
     response_model=list[schemas.RiskDistributionStats],
 )
-async def get_risk_distribution(
+async def get_risk_distribution(request: Request, current_user=Depends(get_token_user)):
+    return await cached_stats(
+        request,
+        lambda aggregates: build_breakdown(aggregates, "risk_level"),
+        RISK_DISTRIBUTION_ADAPTER,
+    )
+
+
+@router.post("/recalculate-risks")
+async def recalculate_risks(
+    background: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    result = await db.execute(
-        select(
-            models.Incident.risk_level,
-            func.count(models.Incident.id).label("count"),
-        )
-        .group_by(models.Incident.risk_level)
-        .order_by(func.count(models.Incident.id).desc())
-    )
-
-    rows = result.all()
+    require_admin(current_user)
 
-    return [
-        {
-            "risk_level": row.risk_level,
-            "count": row.count,
+    if background:
+        job = await start_job(db)
+        return {
+            "message": "Пересчёт рисков запущен",
+            "job_id": job.id,
         }
-        for row in rows
-    ]
 
+    job = RecalculationJob()
+    updated = await recalculate_risks_bulk(db, job)
+    await broadcast_rebuild()
 
-@router.post("/recalculate-risks")
-async def recalculate_risks(
+    return {
+        "message": "Риски пересчитаны",
+        "updated": updated,
+    }
+
+
+@router.get("/recalculate-risks/{job_id}")
+async def get_recalculation_job(
+    job_id: str,
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     require_admin(current_user)
 
-    result = await db.execute(select(models.Incident))
+    job = await load_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
 
-    incidents = result.scalars().all()
+    return job
 
-    updated = 0
 
-    for incident in incidents:
-        risk_score, risk_level = calculate_risk(
-            incident.type,
-            incident.priority,
-            incident.location,
-        )
+@router.get("/risk-rules", response_model=schemas.RiskRules)
+async def get_risk_rules(current_user=Depends(get_current_user)):
+    require_admin(current_user)
 
-        incident.risk_score = risk_score
-        incident.risk_level = risk_level
+    return risk_engine.rules
 
-        updated += 1
 
-    await db.commit()
+@router.put("/risk-rules", response_model=schemas.RiskRules)
+async def update_risk_rules(
+    rules: schemas.RiskRules,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    require_admin(current_user)
 
-    return {
-        "message": "Риски пересчитаны",
-        "updated": updated,
-    }
+    return await save_rules(db, rules, current_user.id)
 
 
 @router.get("/{incident_id}", response_model=schemas.IncidentResponse)
@@ -267,36 +313,44 @@ async def get_incident_by_id(
     return incident
 
 
-@router.get("/priority/{priority}")
+@router.get("/priority/{priority}", response_model=list[schemas.IncidentResponse])
 async def get_incidents_by_priority(
     priority: str,
-    db: AsyncSession = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_token_user),
 ):
     result = await db.execute(
-        select(models.Incident)
-        .options(joinedload(models.Incident.creator))
-        .where(models.Incident.priority == priority)
+        select_incident_rows().where(models.Incident.priority == priority)
     )
-    incidents = result.scalars().all()
 
-    return incidents
+    return json_response([incident_row_to_dict(row) for row in result.all()])
 
 
-@router.get("/search/")
+@router.get("/search/", response_model=schemas.IncidentSearchPage)
 async def search_incidents(
-    location: str,
-    db: AsyncSession = Depends(get_db),
-    current_user=Depends(get_current_user),
+    q: str | None = None,
+    location: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_token_user),
 ):
+    if not q and not location:
+        raise HTTPException(status_code=400, detail="Укажите q или location")
+
     result = await db.execute(
-        select(models.Incident)
-        .options(joinedload(models.Incident.creator))
-        .where(models.Incident.location.contains(location))
+        build_search_query(q, location).offset(offset).limit(limit + 1)
     )
-    incidents = result.scalars().all()
+    rows = result.all()
+
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
 
-    return incidents
+    return json_response(
+        {"items": [incident_row_to_dict(row) for row in rows], "next_offset": next_offset}
+    )
 
 
 @router.post("/", response_model=schemas.IncidentResponse)
@@ -305,47 +359,54 @@ async def create_incident(
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    risk_score, risk_level = calculate_risk(
-        incident.type.value,
-        incident.priority.value,
-        incident.location,
+    # Ручной инцидент от оператора не сворачивается в повтор (это делает
+    # только /bulk), но попадает в индекс: повторы из /bulk сложатся в него
+    now = time.time()
+
+    # INSERT ... RETURNING + известный current_user: без повторного SELECT после commit
+    [created] = await insert_incidents(db, [incident], current_user)
+    # Событие пишется в той же транзакции, рассылает его outbox_dispatcher
+    add_event(
+        db,
+        "incident_created",
+        event_payload(created),
+        stats_delta([(None, incident_snapshot(created))]),
     )
-    recommendation = get_recommendation(risk_score)
+    await db.commit()
+    outbox_dispatcher.notify()
 
-    db_incident = models.Incident(
-        **incident.dict(),
-        creator_id=current_user.id,
-        risk_score=risk_score,
-        risk_level=risk_level,
+    dedup_index.remember(
+        created["type"], created["location"], created["id"], now, created["priority"]
     )
 
-    db.add(db_incident)
+    return created
 
-    await db.commit()
 
-    result = await db.execute(
-        select(models.Incident)
-        .options(joinedload(models.Incident.creator))
-        .where(models.Incident.id == db_incident.id)
-    )
-
-    incident_with_creator = result.scalar_one_or_none()
+@router.post("/bulk", response_model=schemas.IncidentBulkResult)
+async def create_incidents_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    # JSON-массив или NDJSON (Content-Type: application/x-ndjson)
+    incidents, indexes, errors = await read_batch(request)
 
-    incident_with_creator.recommendation = get_recommendation(
-        incident_with_creator.risk_score
-    )
+    # Повторы открытых инцидентов сворачиваются в счётчик occurrences
+    result = await ingest_incidents(db, incidents, indexes, current_user)
+    outbox_dispatcher.notify()
 
-    await manager.broadcast(
-        "incident_created",
-        {
-            "incident_id": incident_with_creator.id
-        }
-    )
+    payloads = result["payloads"]
 
-    return incident_with_creator
+    return {
+        "created": len(payloads),
+        "indexes": result["indexes"],
+        "incidents": payloads,
+        "folded": result["folded"],
+        "errors": errors,
+    }
 
 
-@router.patch("/{incident_id}")
+@router.patch("/{incident_id}", response_model=schemas.IncidentResponse)
 async def update_incident_status(
     incident_id: int,
     status_data: schemas.IncidentStatusUpdate,
@@ -355,31 +416,39 @@ async def update_incident_status(
     require_master_or_admin(current_user)
 
     result = await db.execute(
-        select(models.Incident).where(models.Incident.id == incident_id)
+        select(models.Incident)
+        .options(joinedload(models.Incident.creator))
+        .where(models.Incident.id == incident_id)
     )
     incident = result.scalar_one_or_none()
     if not incident:
         raise HTTPException(status_code=404, detail="Инцидент не найден")
 
-    incident.status = status_data.status
+    before = incident_snapshot(incident)
+
+    incident.status = status_data.status.value
 
     if status_data.status == schemas.IncidentStatus.CLOSED:
 
         if status_data.closed_at:
             incident.closed_at = status_data.closed_at
         else:
-            incident.closed_at = datetime.utcnow()
+            incident.closed_at = datetime.now(timezone.utc)
 
-    await db.commit()
-    await db.refresh(incident)
+    incident.recommendation = get_recommendation(incident.risk_score)
 
-    await manager.broadcast(
+    add_event(
+        db,
         "incident_updated",
-        {
-            "incident_id": incident.id,
-            "status": incident.status
-        }
+        event_payload(incident),
+        stats_delta([(before, incident_snapshot(incident))]),
     )
+    await db.commit()
+    outbox_dispatcher.notify()
+
+    if incident.status == schemas.IncidentStatus.CLOSED.value:
+        dedup_index.forget(incident.id)
+
     return incident
 
 
@@ -392,19 +461,23 @@ async def delete_incident(
     require_admin(current_user)
 
     result = await db.execute(
-        select(models.Incident).where(models.Incident.id == incident_id)
+        select(models.Incident)
+        .options(joinedload(models.Incident.creator))
+        .where(models.Incident.id == incident_id)
     )
     incident = result.scalar_one_or_none()
     if not incident:
         raise HTTPException(status_code=404, detail="Инцидент не найден")
 
+    before = incident_snapshot(incident)
+    incident.recommendation = get_recommendation(incident.risk_score)
+    payload = event_payload(incident)
+
     await db.delete(incident)
+    add_event(db, "incident_deleted", payload, stats_delta([(before, None)]))
     await db.commit()
+    outbox_dispatcher.notify()
+
+    dedup_index.forget(incident_id)
 
-    await manager.broadcast(
-        "incident_deleted",
-        {
-            "incident_id": incident_id
-        }
-    )
     return {"message": "Инцидент удален"}
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, field_validator
+from datetime import datetime, timezone
 from typing import Optional
 from enum import Enum
 
@@ -23,6 +23,14 @@ class IncidentStatusUpdate(BaseModel):
     status: IncidentStatus
     closed_at: datetime | None = None
 
+    @field_validator("closed_at")
+    @classmethod
+    def closed_at_utc(cls, value: datetime | None):
+        # Время без часового пояса считаем UTC: created_at из БД всегда с поясом
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
 
 class IncidentStats(BaseModel):
     total: int
@@ -59,6 +67,12 @@ class IncidentPriority(str, Enum):
     CRITICAL = "критический"
 
 
+class RiskLevel(str, Enum):
+    LOW = "LOW"
+    MEDIUM = "MEDIUM"
+    HIGH = "HIGH"
+
+
 class IncidentCreate(BaseModel):
     title: str
     description: str
@@ -83,10 +97,51 @@ class IncidentResponse(BaseModel):
     created_at: datetime
     creator: Optional[UserShortInfo] = None
 
+    occurrences: int = 1
+    last_occurred_at: datetime | None = None
+
     class Config:
         from_attributes = True
 
 
+class IncidentFilters(BaseModel):
+    status: IncidentStatus | None = None
+    priority: IncidentPriority | None = None
+    type: IncidentType | None = None
+    risk_level: RiskLevel | None = None
+    location: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+
+class IncidentSubscription(BaseModel):
+    location: list[str] = []
+    risk_level: list[RiskLevel] = []
+    priority: list[IncidentPriority] = []
+    type: list[IncidentType] = []
+    incident_id: list[int] = []
+
+
+class IncidentPage(BaseModel):
+    items: list[IncidentResponse]
+    next_cursor: str | None = None
+
+
+class IncidentSearchPage(BaseModel):
+    items: list[IncidentResponse]
+    next_offset: int | None = None
+
+
+class IncidentBulkResult(BaseModel):
+    created: int
+    # Позиции созданных инцидентов во входной пачке
+    indexes: list[int]
+    incidents: list[IncidentResponse]
+    # Тревоги, свёрнутые в уже открытые или только что созданные инциденты
+    folded: list[dict] = []
+    errors: list[dict]
+
+
 class ResolutionStats(BaseModel):
     average_hours: float
 
@@ -101,4 +156,20 @@ class DashboardResponse(BaseModel):
     resolution: ResolutionStats
     risk_distribution: list[RiskDistributionStats]
     locations: list[LocationStats]
-    incident_types: list[IncidentTypeStats]
\ No newline at end of file
+    incident_types: list[IncidentTypeStats]
+
+
+class LocationRiskRule(BaseModel):
+    pattern: str
+    score: int
+
+
+class RiskRules(BaseModel):
+    type_scores: dict[str, int]
+    default_type_score: int = 10
+    priority_scores: dict[str, int]
+    default_priority_score: int = 10
+    location_scores: list[LocationRiskRule]
+    default_location_score: int = 10
+    low_threshold: int = 40
+    medium_threshold: int = 80
\ No newline at end of file
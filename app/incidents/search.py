@@ -0,0 +1,44 @@
+from sqlalchemy import Select, func, or_
+
+from app.incidents import models
+from app.incidents.serialization import select_incident_rows
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_query(query: str | None, location: str | None) -> Select:
+    """Поиск инцидентов с ранжированием.
+
+    query - полнотекстовый поиск (русский словарь) по title, description и
+    location; location - нечёткое совпадение локации через pg_trgm.
+    """
+    incident = models.Incident
+    conditions = []
+    ranks = []
+
+    if query:
+        document = models.incident_search_document()
+        ts_query = func.websearch_to_tsquery(models.SEARCH_CONFIG, query)
+        conditions.append(document.op("@@")(ts_query))
+        ranks.append(func.ts_rank_cd(document, ts_query))
+
+    if location:
+        # ILIKE ловит подстроку, оператор % - опечатки; оба обслуживает GIN-индекс
+        conditions.append(
+            or_(
+                incident.location.ilike(f"%{escape_like(location)}%", escape="\\"),
+                incident.location.op("%")(location),
+            )
+        )
+        ranks.append(func.similarity(incident.location, location))
+
+    order_by = [incident.id.desc()]
+    if ranks:
+        rank = ranks[0]
+        for extra_rank in ranks[1:]:
+            rank = rank + extra_rank
+        order_by.insert(0, rank.desc())
+
+    return select_incident_rows().where(*conditions).order_by(*order_by)
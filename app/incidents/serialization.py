@@ -0,0 +1,58 @@
+from fastapi import Response
+from pydantic_core import to_json
+from sqlalchemy import Select, select
+
+from app.incidents import models
+from app.incidents.recommendations import get_recommendation
+from app.users.models import Users
+
+
+# Только поля IncidentResponse: строки вместо ORM-объектов, без identity map
+INCIDENT_ROW_COLUMNS = (
+    models.Incident.id,
+    models.Incident.title,
+    models.Incident.type,
+    models.Incident.description,
+    models.Incident.priority,
+    models.Incident.risk_score,
+    models.Incident.risk_level,
+    models.Incident.status,
+    models.Incident.location,
+    models.Incident.created_at,
+    models.Incident.occurrences,
+    models.Incident.last_occurred_at,
+    Users.id.label("creator_id"),
+    Users.name.label("creator_name"),
+    Users.role.label("creator_role"),
+)
+
+def select_incident_rows() -> Select:
+    return select(*INCIDENT_ROW_COLUMNS).outerjoin(
+        Users, Users.id == models.Incident.creator_id
+    )
+
+
+def incident_row_to_dict(row) -> dict:
+    item = row._asdict()
+
+    creator_id = item.pop("creator_id")
+    creator_name = item.pop("creator_name")
+    creator_role = item.pop("creator_role")
+
+    item["creator"] = (
+        {"id": creator_id, "name": creator_name, "role": creator_role}
+        if creator_id is not None
+        else None
+    )
+    item["recommendation"] = get_recommendation(item["risk_score"])
+    return item
+
+
+def json_response(content) -> Response:
+    """Ответ из словарей incident_row_to_dict сразу в байты через pydantic-core.
+
+    Словари собраны ровно из полей IncidentResponse, поэтому повторная
+    проверка схемой (больше половины времени на 10k строк) пропускается;
+    response_model маршрута остаётся для документации.
+    """
+    return Response(content=to_json(content), media_type="application/json")
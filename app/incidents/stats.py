@@ -0,0 +1,118 @@
+from collections import Counter
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.incidents import models, schemas
+
+
+def _resolution_seconds():
+    incident = models.Incident
+    return func.extract("epoch", incident.closed_at - incident.created_at)
+
+
+async def fetch_aggregates(db: AsyncSession) -> dict:
+    """Сырые агрегаты по таблице инцидентов за два запроса.
+
+    Из них собираются все ответы /stats*, и их же поддерживает
+    инкрементально StatsCache.
+    """
+    incident = models.Incident
+
+    # Суммы одним проходом по таблице (SUM/COUNT ... FILTER)
+    result = await db.execute(
+        select(
+            func.count(incident.id).label("total"),
+            func.sum(incident.risk_score).label("risk_sum"),
+            func.sum(_resolution_seconds())
+            .filter(incident.closed_at.is_not(None))
+            .label("resolution_seconds"),
+            func.count(incident.id)
+            .filter(incident.closed_at.is_not(None))
+            .label("resolved"),
+        )
+    )
+    row = result.one()
+
+    aggregates = {
+        "total": row.total or 0,
+        "risk_sum": row.risk_sum or 0,
+        "resolution_seconds": float(row.resolution_seconds or 0),
+        "resolved": row.resolved or 0,
+        "status": Counter(),
+        "location": Counter(),
+        "type": Counter(),
+        "risk_level": Counter(),
+    }
+
+    # Разбивки по статусу, локации, типу и уровню риска одним запросом
+    result = await db.execute(
+        select(
+            incident.status,
+            incident.location,
+            incident.type,
+            incident.risk_level,
+            func.grouping(incident.status).label("by_status"),
+            func.grouping(incident.location).label("by_location"),
+            func.grouping(incident.type).label("by_type"),
+            func.count(incident.id).label("count"),
+        ).group_by(
+            func.grouping_sets(
+                incident.status, incident.location, incident.type, incident.risk_level
+            )
+        )
+    )
+
+    for row in result.all():
+        # grouping() = 0 означает, что колонка участвует в текущем наборе
+        if row.by_status == 0:
+            aggregates["status"][row.status] = row.count
+        elif row.by_location == 0:
+            aggregates["location"][row.location] = row.count
+        elif row.by_type == 0:
+            aggregates["type"][row.type] = row.count
+        else:
+            aggregates["risk_level"][row.risk_level] = row.count
+
+    return aggregates
+
+
+def build_stats(aggregates: dict) -> dict:
+    total = aggregates["total"]
+    status = aggregates["status"]
+
+    return {
+        "total": total,
+        "open": status[schemas.IncidentStatus.OPEN.value],
+        "in_progress": status[schemas.IncidentStatus.IN_PROGRESS.value],
+        "closed": status[schemas.IncidentStatus.CLOSED.value],
+        "average_risk": round(aggregates["risk_sum"] / total, 2) if total else 0,
+    }
+
+
+def build_resolution(aggregates: dict) -> dict:
+    resolved = aggregates["resolved"]
+
+    if not resolved:
+        return {"average_hours": 0}
+
+    return {
+        "average_hours": round(aggregates["resolution_seconds"] / resolved / 3600, 2)
+    }
+
+
+def build_breakdown(aggregates: dict, field: str) -> list[dict]:
+    return [
+        {field: value, "count": count}
+        for value, count in aggregates[field].most_common()
+    ]
+
+
+def build_dashboard(aggregates: dict) -> dict:
+    return {
+        "stats": build_stats(aggregates),
+        "resolution": build_resolution(aggregates),
+        "risk_distribution": build_breakdown(aggregates, "risk_level"),
+        "locations": build_breakdown(aggregates, "location"),
+        "incident_types": build_breakdown(aggregates, "type"),
+    }
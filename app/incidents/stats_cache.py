@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.incidents import models
+from app.incidents.stats import fetch_aggregates
+from app.websocket_manager import manager, serialize_internal
+
+
+logger = logging.getLogger(__name__)
+
+BREAKDOWN_FIELDS = ("status", "location", "type", "risk_level")
+SNAPSHOT_FIELDS = (*BREAKDOWN_FIELDS, "risk_score", "created_at", "closed_at")
+
+
+def _utc(value: datetime) -> datetime:
+    # Наивное время (SQLite, старые записи) считаем UTC, иначе вычитание из
+    # времени с поясом падает с TypeError
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def incident_snapshot(incident) -> dict:
+    """Поля инцидента (ORM-объекта или словаря), от которых зависит статистика."""
+    if not isinstance(incident, dict):
+        incident = {field: getattr(incident, field) for field in SNAPSHOT_FIELDS}
+
+    return {
+        "status": incident["status"],
+        "location": incident["location"],
+        "type": incident["type"],
+        "risk_level": incident["risk_level"],
+        "risk_score": incident["risk_score"] or 0,
+        "created_at": incident["created_at"],
+        "closed_at": incident["closed_at"],
+    }
+
+
+def _account(aggregates: dict, snapshot: dict, sign: int):
+    aggregates["total"] += sign
+    aggregates["risk_sum"] += sign * snapshot["risk_score"]
+
+    for field in BREAKDOWN_FIELDS:
+        aggregates[field][snapshot[field]] += sign
+
+    if snapshot["closed_at"] and snapshot["created_at"]:
+        seconds = (
+            _utc(snapshot["closed_at"]) - _utc(snapshot["created_at"])
+        ).total_seconds()
+        aggregates["resolution_seconds"] += sign * seconds
+        aggregates["resolved"] += sign
+
+
+def stats_delta(changes: Iterable[tuple[dict | None, dict | None]]) -> dict:
+    """Изменение агрегатов от правок (before, after) в виде для JSON.
+
+    Пишется в outbox вместе с событием (OutboxEvent.stats_delta), и его
+    применяют все воркеры. Разбивки - списки пар [значение, изменение]:
+    ключом может быть и None.
+    """
+    delta = {
+        "total": 0,
+        "risk_sum": 0,
+        "resolution_seconds": 0.0,
+        "resolved": 0,
+        **{field: Counter() for field in BREAKDOWN_FIELDS},
+    }
+
+    # Изменение = вычесть старый снимок инцидента и прибавить новый
+    for before, after in changes:
+        if before:
+            _account(delta, before, -1)
+        if after:
+            _account(delta, after, 1)
+
+    for field in BREAKDOWN_FIELDS:
+        delta[field] = [[value, count] for value, count in delta[field].items() if count]
+    return delta
+
+
+async def read_snapshot(session: AsyncSession) -> tuple[dict, int, set[int]]:
+    """Агрегаты и состояние outbox на один момент.
+
+    Возвращает агрегаты, последний разосланный dispatch_seq и id ещё не
+    разосланных событий: их изменения в агрегатах уже учтены.
+    """
+    if session.bind.dialect.name == "postgresql":
+        # Все три запроса - в одном снимке БД
+        await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    event = models.OutboxEvent
+
+    aggregates = await fetch_aggregates(session)
+    watermark = (await session.execute(select(func.max(event.dispatch_seq)))).scalar() or 0
+    pending = await session.execute(select(event.id).where(event.dispatched_at.is_(None)))
+
+    return aggregates, watermark, set(pending.scalars())
+
+
+class StatsCache:
+    """Агрегаты по инцидентам в памяти процесса.
+
+    Изменения приходят от OutboxDispatcher через брокер в каждый воркер,
+    включая тот, что принял запрос, а периодическая сверка перечитывает
+    агрегаты из БД, поэтому чтение /stats* не ходит в базу.
+    """
+
+    def __init__(self):
+        self.aggregates: dict | None = None
+        self.rebuilt_at: datetime | None = None
+        # Растёт при каждом изменении агрегатов, по ней сбрасывается кэш ответов /stats*
+        self.version = 0
+        # (seq, id события, дельта), пришедшие во время rebuild: после
+        # снимка применяются только те, которых в нём ещё нет
+        self._received: list[tuple[int, int, dict]] | None = None
+        self._lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def ready(self) -> bool:
+        return self.aggregates is not None
+
+    async def get(self) -> dict:
+        if self.aggregates is None:
+            async with self._lock:
+                if self.aggregates is None:
+                    await self._rebuild()
+        return self.aggregates
+
+    async def rebuild(self) -> dict:
+        async with self._lock:
+            return await self._rebuild()
+
+    async def _rebuild(self) -> dict:
+        self._received = []
+        try:
+            async with async_session_maker() as session:
+                aggregates, watermark, pending = await read_snapshot(session)
+            received = self._received
+        finally:
+            self._received = None
+
+        # Событие уже в снимке, если разослано до него или ещё ждало рассылки
+        for seq, event_id, delta in received:
+            if seq > watermark and event_id not in pending:
+                self._add(aggregates, delta)
+
+        self.aggregates = aggregates
+        self.rebuilt_at = datetime.now(timezone.utc)
+        self.version += 1
+        return aggregates
+
+    def schedule_rebuild(self, message: dict | None = None):
+        """Пересборка по сообщению "stats_rebuild" (см. broadcast_rebuild)."""
+        task = asyncio.create_task(self._rebuild_logged())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _rebuild_logged(self):
+        try:
+            await self.rebuild()
+        except Exception:
+            logger.exception("Не удалось пересобрать кэш статистики")
+
+    def invalidate(self):
+        self.aggregates = None
+        self.version += 1
+
+    def receive(self, message: dict):
+        """Дельта из outbox: {"seq", "id", "delta"} (см. OutboxDispatcher)."""
+        if self._received is not None:
+            self._received.append((message["seq"], message["id"], message["delta"]))
+
+        # Пока кэш не прогрет, копить нечего: первое чтение построит его из БД
+        if self.aggregates is not None:
+            self._add(self.aggregates, message["delta"])
+            self.version += 1
+
+    @staticmethod
+    def _add(aggregates: dict, delta: dict):
+        for key in ("total", "risk_sum", "resolution_seconds", "resolved"):
+            aggregates[key] += delta[key]
+
+        for field in BREAKDOWN_FIELDS:
+            counter: Counter = aggregates[field]
+            for value, count in delta[field]:
+                counter[value] += count
+                if counter[value] <= 0:
+                    del counter[value]
+
+    async def check(self) -> dict:
+        """Сравнивает кэш с фактическими агрегатами в БД."""
+        cached = await self.get()
+
+        async with async_session_maker() as session:
+            actual = await fetch_aggregates(session)
+
+        differences = {}
+
+        for key, actual_value in actual.items():
+            cached_value = cached.get(key)
+            if key == "resolution_seconds":
+                equal = abs((cached_value or 0) - actual_value) < 1
+            else:
+                equal = cached_value == actual_value
+            if not equal:
+                differences[key] = {"cached": cached_value, "actual": actual_value}
+
+        return {
+            "consistent": not differences,
+            "rebuilt_at": self.rebuilt_at,
+            "differences": differences,
+        }
+
+    async def run_reconciliation(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self._rebuild_logged()
+
+
+async def broadcast_rebuild():
+    """Пересобрать кэш во всех воркерах.
+
+    Для массовых изменений без дельты, например пересчёта рисков.
+    """
+    await manager.publish([serialize_internal("stats_rebuild", {})])
+
+
+stats_cache = StatsCache()
@@ -1,17 +1,75 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.config import settings
 from app.users.router import router as users_router
 from app.incidents.router import router as incidents_router
+from app.monitoring.instrumentation import setup_instrumentation
+from app.monitoring.profiling import ProfilingMiddleware
+from app.monitoring.router import metrics_router, profiles_router, router as health_router
+from app.replica import replica_monitor
+from app.incidents.risk_rules import init_risk_engine, run_rules_refresh
+from app.incidents.dedup import dedup_index
+from app.incidents.outbox import outbox_dispatcher
+from app.incidents.stats_cache import stats_cache
+from app.users.cache import user_cache
+from app.websocket_manager import manager
 from fastapi.middleware.cors import CORSMiddleware
 
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_risk_engine()
+    await dedup_index.warm_on_startup()
+    # Дельты статистики из outbox приходят через брокер в каждый воркер
+    manager.add_handler("stats", stats_cache.receive)
+    manager.add_handler("stats_rebuild", stats_cache.schedule_rebuild)
+    manager.add_handler("user_invalidate", user_cache.receive_invalidation)
+    await manager.start()
+
+    background_tasks = [
+        asyncio.create_task(
+            stats_cache.run_reconciliation(settings.STATS_RECONCILE_SECONDS)
+        ),
+        asyncio.create_task(outbox_dispatcher.run()),
+        asyncio.create_task(run_rules_refresh(settings.RISK_RULES_CHECK_SECONDS)),
+    ]
+
+    if replica_monitor.engine is not None:
+        await replica_monitor.check()
+        background_tasks.append(asyncio.create_task(replica_monitor.run()))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    # Остаток outbox успеет уйти клиентам до остановки брокера; что не
+    # разошлось, подберёт диспетчер после перезапуска
+    try:
+        await outbox_dispatcher.drain()
+    except Exception:
+        logger.exception("Не удалось разослать остаток outbox при остановке")
+
+    await manager.stop()
+
 
 app = FastAPI(
     title="Incident Assistant API",
     description="Цифровой помощник для управления инцидентами на НПЗ",
+    lifespan=lifespan,
 )
 
 app.include_router(users_router)
 app.include_router(incidents_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(profiles_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +79,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware)
+setup_instrumentation(app)
+
 @app.get("/")
 async def root():
     return {"message": "Incident Assistant API работает! 🚀"}
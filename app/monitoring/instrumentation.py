@@ -0,0 +1,145 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import engine, replica_engine
+from app.incidents.outbox import outbox_dispatcher
+from app.monitoring.metrics import (
+    CallbackCounter,
+    Gauge,
+    db_statements_per_request,
+    db_statements_total,
+    db_time_per_request,
+    http_request_duration,
+    registry,
+)
+from app.monitoring.pool import pool_stats, replica_pool_stats
+from app.websocket_manager import manager
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+# Счётчики SQL текущего HTTP-запроса; события движка пишут в них
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(async_engine: AsyncEngine, pool_name: str):
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_statements_total.inc(pool_name)
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # after_cursor_execute при ошибке не вызывается
+        connection = context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: время запроса по шаблону маршрута и SQL на запрос."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_stats.reset(token)
+
+            # Шаблон пути, а не сам путь: /incidents/{incident_id} - одна серия
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+
+            http_request_duration.observe(
+                time.perf_counter() - started, scope["method"], route_path, status
+            )
+            db_statements_per_request.observe(stats.statements, route_path)
+            db_time_per_request.observe(stats.db_seconds, route_path)
+
+
+def _pools() -> dict:
+    pools = {"primary": (engine.pool, pool_stats)}
+    if replica_engine is not None:
+        pools["replica"] = (replica_engine.pool, replica_pool_stats)
+    return pools
+
+
+def _pool_values(read) -> dict:
+    return {(name,): read(pool, stats) for name, (pool, stats) in _pools().items()}
+
+
+def register_runtime_metrics():
+    registry.register(Gauge(
+        "db_pool_checked_out", "Выданные соединения пула",
+        lambda: _pool_values(lambda pool, stats: pool.checkedout()), labels=("pool",),
+    ))
+    registry.register(Gauge(
+        "db_pool_overflow", "Соединения сверх pool_size",
+        lambda: _pool_values(lambda pool, stats: max(pool.overflow(), 0)), labels=("pool",),
+    ))
+    registry.register(Gauge(
+        "db_pool_waiting", "Запросы, ждущие соединение",
+        lambda: _pool_values(lambda pool, stats: stats.waiting), labels=("pool",),
+    ))
+    registry.register(CallbackCounter(
+        "db_pool_timeouts_total", "Таймауты ожидания соединения",
+        lambda: _pool_values(lambda pool, stats: stats.timeouts), labels=("pool",),
+    ))
+    registry.register(Gauge(
+        "ws_connections", "Подключённые websocket-клиенты",
+        lambda: {(): len(manager.clients)},
+    ))
+    registry.register(Gauge(
+        "ws_queued_events", "События в очередях websocket-клиентов",
+        lambda: {(): sum(client.queue.qsize() for client in manager.clients.values())},
+    ))
+    registry.register(CallbackCounter(
+        "outbox_dispatched_total", "События outbox, разосланные этим воркером",
+        lambda: {(): outbox_dispatcher.dispatched},
+    ))
+
+
+def setup_instrumentation(app):
+    instrument_engine(engine, "primary")
+    if replica_engine is not None:
+        instrument_engine(replica_engine, "replica")
+
+    register_runtime_metrics()
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,184 @@
+"""Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Запись - словарь по кортежу значений меток и bisect для гистограмм:
+всё выполняется в event loop, блокировки не нужны.
+"""
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return self.header() + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Значение считывается функцией в момент выгрузки - на горячем пути ничего не делается."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback: Callable[[], dict[tuple, float]], labels=()):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self.callback().items()
+        ]
+
+
+class CallbackCounter(Gauge):
+    # Монотонные счётчики, которые уже ведёт кто-то другой (например, PoolStats)
+    kind = "counter"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [счётчики по корзинам (+Inf последняя), сумма, количество]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self) -> list[str]:
+        lines = []
+
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(
+                    self.label_names, labels, f'le="{_format_value(float(bound))}"'
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+
+            plain_labels = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain_labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain_labels} {count}")
+
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# Метрики, которые пишутся из разных модулей приложения
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    labels=("method", "route", "status"),
+))
+db_statements_per_request = registry.register(Histogram(
+    "db_statements_per_request",
+    "Число SQL-запросов на один HTTP-запрос",
+    labels=("route",),
+    buckets=COUNT_BUCKETS,
+))
+db_time_per_request = registry.register(Histogram(
+    "db_time_per_request_seconds",
+    "Суммарное время SQL-запросов на один HTTP-запрос",
+    labels=("route",),
+))
+db_statements_total = registry.register(Counter(
+    "db_statements_total",
+    "Выполнено SQL-запросов",
+    labels=("pool",),
+))
+db_pool_acquire_duration = registry.register(Histogram(
+    "db_pool_acquire_duration_seconds",
+    "Время получения соединения из пула",
+    labels=("pool",),
+))
+ws_fanout_duration = registry.register(Histogram(
+    "ws_fanout_duration_seconds",
+    "Разбор пачки событий брокера и постановка в очереди клиентов",
+))
+ws_events_total = registry.register(Counter(
+    "ws_events_total",
+    "Событий, разосланных websocket-клиентам",
+))
+ws_dropped_total = registry.register(Counter(
+    "ws_dropped_total",
+    "Событий, не доставленных медленным клиентам",
+    labels=("policy",),
+))
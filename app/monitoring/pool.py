@@ -0,0 +1,79 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.monitoring.metrics import db_pool_acquire_duration
+
+
+class PoolStats:
+    """Ожидание соединений из пула: сколько ждут сейчас, сколько ждали и таймауты."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, seconds: float):
+        self.acquired += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        db_pool_acquire_duration.observe(seconds, self.name)
+
+    def as_dict(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": (
+                self.wait_seconds_total / self.acquired * 1000 if self.acquired else 0.0
+            ),
+            "wait_ms_max": self.wait_seconds_max * 1000,
+        }
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который замеряет время получения соединения."""
+
+    stats: PoolStats
+
+    def connect(self):
+        pool_stats = self.stats
+        pool_stats.waiting += 1
+        started = time.perf_counter()
+
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.waiting -= 1
+
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+
+def instrumented_pool(stats: PoolStats) -> type[InstrumentedPool]:
+    # Класс на каждый движок: пул пересоздаётся через self.__class__, статистика сохраняется
+    return type("InstrumentedPool", (InstrumentedPool,), {"stats": stats})
+
+
+# Пулы основной БД и реплики чтения
+pool_stats = PoolStats("primary")
+replica_pool_stats = PoolStats("replica")
+
+
+def pool_status(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout_seconds": pool.timeout(),
+        **pool.stats.as_dict(),
+    }
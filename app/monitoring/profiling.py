@@ -0,0 +1,197 @@
+"""Профилирование отдельных запросов через cProfile.
+
+Профиль снимается с потока целиком: пока запрос ждёт БД, в него попадают
+и другие корутины event loop. Одновременно профилируется один запрос.
+"""
+import cProfile
+import heapq
+import io
+import itertools
+import marshal
+import pstats
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from starlette.requests import Request
+
+from app.config import settings
+from app.users.dependencies import get_user_by_id
+from app.users.permissions import require_admin
+
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Профили, запрошенные явно, хранятся отдельно от выборки самых медленных
+REQUESTED_KEEP = 50
+
+
+class RequestProfile:
+    def __init__(
+        self,
+        profile_id: str,
+        scope,
+        profiler: cProfile.Profile,
+        duration: float,
+        status: int,
+        sampled: bool,
+    ):
+        profiler.create_stats()
+
+        self.id = profile_id
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.route = getattr(scope.get("route"), "path", None)
+        self.status = status
+        self.duration = duration
+        self.sampled = sampled
+        self.created_at = datetime.utcnow()
+        self.stats = profiler.stats
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": self.duration * 1000,
+            "sampled": self.sampled,
+            "created_at": self.created_at,
+        }
+
+    def render(self, sort: str = "cumulative", limit: int = 60) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.stats = self.stats
+        stats.get_top_level_stats()
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self) -> bytes:
+        # Формат cProfile.dump_stats: открывается snakeviz, pstats и т.п.
+        return marshal.dumps(self.stats)
+
+
+class ProfileStore:
+    def __init__(self, slowest_keep: int, requested_keep: int = REQUESTED_KEEP):
+        self.slowest_keep = slowest_keep
+        self.requested: OrderedDict[str, RequestProfile] = OrderedDict()
+        self.requested_keep = requested_keep
+        # min-куча по длительности: в корне самый быстрый из сохранённых
+        self.slowest: list[tuple[float, int, RequestProfile]] = []
+        self._order = itertools.count()
+
+    def add(self, profile: RequestProfile):
+        if not profile.sampled:
+            self.requested[profile.id] = profile
+            while len(self.requested) > self.requested_keep:
+                self.requested.popitem(last=False)
+            return
+
+        entry = (profile.duration, next(self._order), profile)
+        if len(self.slowest) < self.slowest_keep:
+            heapq.heappush(self.slowest, entry)
+        elif self.slowest and profile.duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        if profile_id in self.requested:
+            return self.requested[profile_id]
+        for _, _, profile in self.slowest:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def listing(self) -> dict:
+        return {
+            "requested": [profile.summary() for profile in reversed(self.requested.values())],
+            "slowest": [
+                profile.summary()
+                for _, _, profile in sorted(self.slowest, key=lambda entry: entry[0], reverse=True)
+            ],
+        }
+
+    def clear(self):
+        self.requested.clear()
+        self.slowest.clear()
+
+
+profile_store = ProfileStore(settings.PROFILE_SLOWEST_KEEP)
+
+
+async def profile_requested(scope) -> bool:
+    """Флаг профилирования от администратора.
+
+    Роль берётся из кэша пользователей или БД, а не из claims токена:
+    после понижения роли старый токен профилирование не включит.
+    """
+    request = Request(scope)
+    if request.headers.get(PROFILE_HEADER) != "1" and request.query_params.get("profile") != "1":
+        return False
+
+    token = request.cookies.get("incident_access_token")
+    auth_header = request.headers.get("authorization", "")
+    if not token and auth_header.startswith("Bearer "):
+        token = auth_header[7:]
+    if not token:
+        return False
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user = await get_user_by_id(int(payload["sub"]))
+        if user is None:
+            return False
+        require_admin(user)
+    except (JWTError, KeyError, ValueError, HTTPException):
+        return False
+
+    return True
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, sample_rate: float = settings.PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.active:
+            await self.app(scope, receive, send)
+            return
+
+        requested = await profile_requested(scope)
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        profile_id = uuid.uuid4().hex
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    headers = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        self.active = True
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            self.active = False
+
+            duration = time.perf_counter() - started
+            profile_store.add(
+                RequestProfile(profile_id, scope, profiler, duration, status, sampled=not requested)
+            )
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from sqlalchemy import text
+
+from app.database import engine, replica_engine
+from app.monitoring.metrics import registry
+from app.monitoring.pool import pool_status
+from app.monitoring.profiling import profile_store
+from app.replica import replica_monitor
+from app.users.dependencies import get_current_user
+from app.users.permissions import require_admin
+
+
+# Сколько ждать SELECT 1: при исчерпанном пуле ответ нужен раньше, чем pool_timeout
+HEALTH_PING_TIMEOUT_SECONDS = 2
+
+
+router = APIRouter(prefix="/health", tags=["Health"])
+metrics_router = APIRouter(tags=["Health"])
+profiles_router = APIRouter(prefix="/admin/profiles", tags=["Health"])
+
+
+async def ping_database() -> float:
+    started = time.perf_counter()
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    return (time.perf_counter() - started) * 1000
+
+
+@router.get("/db")
+async def database_health():
+    # Состояние пула снимается до проверки, чтобы она сама его не искажала
+    pool = pool_status(engine.pool)
+    replica = replica_monitor.status()
+    if replica_engine is not None:
+        replica["pool"] = pool_status(replica_engine.pool)
+
+    try:
+        ping_ms = await asyncio.wait_for(ping_database(), HEALTH_PING_TIMEOUT_SECONDS)
+    except Exception as error:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "unavailable",
+                "error": str(error) or type(error).__name__,
+                "pool": pool,
+                "replica": replica,
+            },
+        )
+
+    return {"status": "ok", "ping_ms": ping_ms, "pool": pool, "replica": replica}
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@profiles_router.get("")
+async def list_profiles(current_user=Depends(get_current_user)):
+    # Запросы с X-Profile: 1 / ?profile=1 и выборка самых медленных
+    require_admin(current_user)
+
+    return profile_store.listing()
+
+
+@profiles_router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+    limit: int = Query(60, ge=1, le=500),
+    raw: bool = False,
+    current_user=Depends(get_current_user),
+):
+    require_admin(current_user)
+
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+
+    if raw:
+        return Response(
+            content=profile.dump(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+        )
+
+    return PlainTextResponse(profile.render(sort, limit))
+
+
+@profiles_router.delete("")
+async def clear_profiles(current_user=Depends(get_current_user)):
+    require_admin(current_user)
+
+    profile_store.clear()
+    return {"message": "Профили удалены"}
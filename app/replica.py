@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import settings
+from app.database import async_session_maker, get_db, replica_engine, replica_session_maker
+
+
+logger = logging.getLogger(__name__)
+
+
+# Отставание реплики в секундах; без новых транзакций на основной БД
+# pg_last_xact_replay_timestamp() стареет, поэтому при догнавшем WAL лаг 0
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReplicaMonitor:
+    """Периодически проверяет реплику: доступность и отставание."""
+
+    def __init__(self, engine: AsyncEngine | None, max_lag: float, interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.available = False
+        self.lag: float | None = None
+        self.last_error: str | None = None
+
+    @property
+    def usable(self) -> bool:
+        return (
+            self.engine is not None
+            and self.available
+            and self.lag is not None
+            and self.lag <= self.max_lag
+        )
+
+    async def _measure_lag(self) -> float:
+        async with self.engine.connect() as connection:
+            if connection.dialect.name != "postgresql":
+                # SQLite и прочие заглушки в тестах: только проверка доступности
+                await connection.execute(text("SELECT 1"))
+                return 0.0
+            return float((await connection.execute(REPLICA_LAG_QUERY)).scalar() or 0)
+
+    async def check(self):
+        try:
+            lag = await asyncio.wait_for(self._measure_lag(), self.interval)
+        except Exception as error:
+            self.mark_down(error)
+            return
+
+        if not self.available:
+            logger.info("Реплика доступна, отставание %.1f с", lag)
+        elif lag > self.max_lag >= (self.lag or 0):
+            logger.warning("Реплика отстаёт на %.1f с, чтение переключено на основную БД", lag)
+
+        self.available = True
+        self.lag = lag
+        self.last_error = None
+
+    def mark_down(self, error: Exception):
+        if self.available:
+            logger.warning("Реплика недоступна, чтение переключено на основную БД: %s", error)
+        self.available = False
+        self.last_error = str(error) or type(error).__name__
+
+    async def run(self):
+        # Первая проверка делается в lifespan до приёма запросов
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def status(self) -> dict:
+        return {
+            "configured": self.engine is not None,
+            "usable": self.usable,
+            "available": self.available,
+            "lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag,
+            "last_error": self.last_error,
+        }
+
+
+replica_monitor = ReplicaMonitor(
+    replica_engine,
+    settings.DB_REPLICA_MAX_LAG_SECONDS,
+    settings.DB_REPLICA_CHECK_SECONDS,
+)
+
+
+def _is_connection_error(error: DBAPIError) -> bool:
+    return error.connection_invalidated or isinstance(error, OperationalError)
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для read-only маршрутов: реплика, если она в порядке, иначе основная БД."""
+    if not replica_monitor.usable:
+        async for session in get_db():
+            yield session
+        return
+
+    async with replica_session_maker() as session:
+        try:
+            yield session
+        except DBAPIError as error:
+            # Не ждём следующей проверки: следующие запросы сразу идут на основную БД
+            if _is_connection_error(error):
+                replica_monitor.mark_down(error)
+            raise
+
+
+@asynccontextmanager
+async def read_session() -> AsyncGenerator[AsyncSession, None]:
+    """То же для кода вне зависимостей FastAPI (потоковая выгрузка и т.п.)."""
+    maker = replica_session_maker if replica_monitor.usable else async_session_maker
+
+    async with maker() as session:
+        yield session
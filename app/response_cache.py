@@ -0,0 +1,97 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+
+# Справочники не меняются без релиза, статистику клиент перепроверяет каждый раз
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+class CachedResponse:
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        # ETag по содержимому: одинаков на всех воркерах при одинаковых данных
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def render(content: Any, adapter: TypeAdapter | None = None, version: int = 0) -> CachedResponse:
+    adapter = adapter or TypeAdapter(Any)
+    return CachedResponse(version, adapter.dump_json(adapter.validate_python(content)))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def conditional_response(
+    request: Request,
+    cached: CachedResponse,
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+
+    if etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """Готовые JSON-ответы по маршруту и параметрам запроса.
+
+    Запись действительна, пока не изменилась версия данных, от которых
+    она построена (например, stats_cache.version). Версию нужно брать
+    уже после загрузки данных, build() только собирает из них ответ.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(request: Request) -> tuple:
+        return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+    def respond(
+        self,
+        request: Request,
+        version: int,
+        build: Callable[[], Any],
+        adapter: TypeAdapter,
+        cache_control: str = REVALIDATE_CACHE_CONTROL,
+    ) -> Response:
+        key = self.key(request)
+        cached = self._entries.get(key)
+
+        if cached is not None and cached.version == version:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            cached = render(build(), adapter, version)
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return conditional_response(request, cached, cache_control)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache()
@@ -1,11 +1,31 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from jose import jwt
+from app.exceptions import PasswordHashingBusy
 from app.users.dao import UsersDAO
 from app.config import settings
 
 # pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# Argon2 нагружает CPU и память, поэтому считается в отдельном пуле потоков
+# (argon2-cffi отпускает GIL), а не в event loop. Ожидающих задач не больше
+# PASSWORD_HASH_QUEUE, остальные запросы сразу получают 503.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_hash_slots = asyncio.Semaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+)
 
 
 def get_password_hash(password: str) -> str:
@@ -16,6 +36,28 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def _run_in_hash_pool(func, *args):
+    if _hash_slots.locked():
+        raise PasswordHashingBusy
+
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+def token_claims(user) -> dict:
+    # Роль и имя в токене позволяют read-only маршрутам обходиться без БД
+    return {"sub": str(user.id), "role": user.role, "name": user.name}
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=30)
@@ -31,6 +73,6 @@ def create_refresh_token(data: dict) -> str:
 
 async def authenticate_user(email: str, password: str):
     user = await UsersDAO.find_one_or_none(email=email)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await check_password(password, user.hashed_password):
         return None
     return user
@@ -0,0 +1,74 @@
+import logging
+import time
+from collections import OrderedDict
+
+from app.brokers import PublishError
+from app.config import settings
+from app.websocket_manager import manager, serialize_internal
+
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Ограниченный по размеру TTL-кэш пользователей по id."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[int, tuple[float, object]] = OrderedDict()
+
+    def get(self, user_id: int):
+        item = self._items.get(user_id)
+
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._items[user_id]
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(user_id)
+        self.hits += 1
+        return item[1]
+
+    def set(self, user_id: int, user):
+        self._items[user_id] = (time.monotonic() + self.ttl, user)
+        self._items.move_to_end(user_id)
+
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._items.pop(user_id, None)
+
+    def receive_invalidation(self, message: dict):
+        """Сообщение "user_invalidate" от другого воркера (см. broadcast_invalidation)."""
+        self.invalidate(message["id"])
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+
+async def broadcast_invalidation(user_id: int):
+    """Сбросить пользователя в кэше всех воркеров, а не только текущего."""
+    user_cache.invalidate(user_id)
+
+    try:
+        await manager.publish([serialize_internal("user_invalidate", {"id": user_id})])
+    except PublishError:
+        # Остальные воркеры увидят изменение не позже чем через TTL кэша
+        logger.exception("Не удалось разослать сброс кэша пользователя %s", user_id)
+
+
+user_cache = UserCache(settings.USER_CACHE_TTL_SECONDS, settings.USER_CACHE_SIZE)
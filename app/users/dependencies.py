@@ -1,8 +1,12 @@
 from fastapi import Depends, HTTPException, Request, Response, status
 from jose import jwt, JWTError
-from app.users.auth import create_access_token, create_refresh_token
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.users.auth import create_access_token, create_refresh_token, token_claims
+from app.users.cache import user_cache
 from app.users.dao import UsersDAO
+from app.users.schemas import TokenUser
 from app.config import settings
+from app.database import get_db
 
 
 async def get_token_from_request(request: Request) -> str:
@@ -23,6 +27,18 @@ async def get_token_from_request(request: Request) -> str:
     return token
 
 
+async def get_user_by_id(user_id: int, session: AsyncSession | None = None):
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await UsersDAO.find_by_id(user_id, session=session)
+        if user:
+            # В кэше объект живёт дольше запроса - отвязываем его от сессии
+            if session is not None:
+                session.expunge(user)
+            user_cache.set(user_id, user)
+    return user
+
+
 # async def get_current_user(token: str = Depends(get_token_from_request)):
 #     try:
 #         # ВАЖНО: algorithms=[settings.ALGORITHM] - множественное число!
@@ -48,7 +64,9 @@ async def get_token_from_request(request: Request) -> str:
 async def get_current_user(
     request: Request, 
     response: Response,
-    token: str = Depends(get_token_from_request)
+    token: str = Depends(get_token_from_request),
+    # Та же сессия, что у маршрута: одно соединение из пула на запрос
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         # Пробуем декодировать access token
@@ -72,12 +90,12 @@ async def get_current_user(
                 raise HTTPException(status_code=401, detail="Invalid refresh token")
                 
             # Проверяем пользователя
-            user = await UsersDAO.find_by_id(int(user_id))
+            user = await get_user_by_id(int(user_id), db)
             if not user:
                 raise HTTPException(status_code=401, detail="User not found")
             
             # СОЗДАЁМ НОВЫЕ ТОКЕНЫ
-            new_access_token = create_access_token({"sub": str(user.id)})
+            new_access_token = create_access_token(token_claims(user))
             new_refresh_token = create_refresh_token({"sub": str(user.id)})
             
             # ОБНОВЛЯЕМ КУКИ
@@ -90,12 +108,31 @@ async def get_current_user(
             raise HTTPException(status_code=401, detail="Refresh token expired")
     
     # Если access token валиден - просто возвращаем пользователя
-    user = await UsersDAO.find_by_id(int(user_id))
+    user = await get_user_by_id(int(user_id), db)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
 
+async def get_token_user(
+    request: Request,
+    response: Response,
+    token: str = Depends(get_token_from_request),
+    db: AsyncSession = Depends(get_db),
+):
+    # Для read-only маршрутов: пользователь из claims access token без обращения к БД.
+    # Старые токены без role/name и истёкшие токены идут через get_current_user.
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        payload = {}
+
+    if payload.get("sub") and payload.get("role") and payload.get("name"):
+        return TokenUser(id=int(payload["sub"]), name=payload["name"], role=payload["role"])
+
+    return await get_current_user(request, response, token, db)
+
+
 async def get_current_admin_user(current_user=Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
@@ -4,8 +4,10 @@ from app.users.auth import (
     authenticate_user,
     create_access_token,
     create_refresh_token,
-    get_password_hash,
+    hash_password,
+    token_claims,
 )
+from app.users.cache import broadcast_invalidation, user_cache
 from app.users.dao import UsersDAO
 from app.users.dependencies import get_current_user
 from fastapi import HTTPException
@@ -30,7 +32,7 @@ async def register_user(user_data: UserRegister):
     if existing_user:
         raise UserAlreadyExists
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     await UsersDAO.add(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -51,7 +53,7 @@ async def login_user(response: Response, user_data: UserAuth):
         else:
             raise NotCorrectAuthData
 
-    access_token = create_access_token({"sub": str(user.id)})
+    access_token = create_access_token(token_claims(user))
     refresh_token = create_refresh_token({"sub": str(user.id)})
 
     response.set_cookie("incident_access_token", access_token, httponly=True)
@@ -117,8 +119,21 @@ async def update_user_role(
     await db.commit()
     await db.refresh(user)
 
+    await broadcast_invalidation(user.id)
+
     return {
         "message": "Роль обновлена",
         "user_id": user.id,
         "new_role": user.role,
     }
+
+
+@router.get("/users/cache")
+async def get_user_cache_stats(current_user=Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Недостаточно прав",
+        )
+
+    return user_cache.stats()
@@ -27,4 +27,9 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 class UserRoleUpdate(BaseModel):
-    role: UserRole
\ No newline at end of file
+    role: UserRole
+
+class TokenUser(BaseModel):
+    id: int
+    name: str
+    role: str
\ No newline at end of file
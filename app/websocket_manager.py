@@ -1,38 +1,274 @@
 from fastapi import WebSocket
-from typing import List
+from typing import Callable, List
+from collections import Counter
+import asyncio
 import json
+import logging
+import time
+from app.brokers import RESYNC_EVENT, Broker, create_broker
+from app.config import settings
+from app.monitoring.metrics import ws_dropped_total, ws_events_total, ws_fanout_duration
+
+
+logger = logging.getLogger(__name__)
+
+# Отправляется клиенту вместо пропущенных событий: нужно перечитать данные целиком
+RESYNC_MESSAGE = RESYNC_EVENT
+
+# Поля payload события, по которым клиент может подписаться
+FILTER_FIELDS = ("location", "risk_level", "priority", "type", "incident_id")
+
+
+def serialize_event(event_type: str, payload: dict | None = None, seq: int | None = None) -> str:
+    # seq - dispatch_seq события в outbox_events, общий для всех воркеров:
+    # по нему клиент догоняет пропущенное через GET /incidents/changes
+    message = {"type": event_type, "payload": payload or {}}
+    if seq is not None:
+        message = {"seq": seq, **message}
+    return json.dumps(message, ensure_ascii=False)
+
+
+def serialize_internal(kind: str, payload: dict) -> str:
+    # Сообщение для воркеров (например, дельта кэша статистики), клиентам
+    # не отправляется; обработчик регистрируется через add_handler
+    return json.dumps({"internal": kind, "payload": payload}, ensure_ascii=False)
+
+
+INTERNAL_PREFIX = '{"internal": '
+
+
+def filter_key(field: str, value) -> tuple[str, str]:
+    if field == "location":
+        return field, str(value).strip().lower()
+    return field, str(value)
+
+
+class ClientConnection:
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.writer: asyncio.Task | None = None
+        self.dropped = 0
+        # {поле: значения}; пусто - клиент получает все события
+        self.filters: dict[str, set] = {}
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """Рассылка событий по websocket.
+
+    Сообщение сериализуется один раз и публикуется через брокер, который
+    доставляет его во все воркеры. Там оно кладётся в ограниченные очереди
+    клиентов; отправкой занимается отдельная задача на каждое соединение,
+    поэтому медленный клиент не задерживает остальных и HTTP-запрос.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = settings.WS_QUEUE_SIZE,
+        slow_consumer_policy: str = settings.WS_SLOW_CONSUMER_POLICY,
+        send_timeout: float = settings.WS_SEND_TIMEOUT_SECONDS,
+        broker: Broker | None = None,
+    ):
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.clients: dict[WebSocket, ClientConnection] = {}
+        # Подписки: клиенты без фильтров и индекс (поле, значение) -> клиенты,
+        # чтобы маршрутизация не перебирала все соединения
+        self.unfiltered: set[ClientConnection] = set()
+        self.index: dict[tuple[str, str], set[ClientConnection]] = {}
+        self.handlers: dict[str, Callable[[dict], None]] = {}
+        self.broker = broker or create_broker()
+        self.broker.handler = self._receive
+
+    async def start(self):
+        await self.broker.start(self._receive)
+
+    async def stop(self):
+        await self.broker.stop()
+
+    def add_handler(self, kind: str, handler: Callable[[dict], None]):
+        self.handlers[kind] = handler
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+
+        client = ClientConnection(websocket, self.queue_size)
+        client.writer = asyncio.create_task(self._writer(client))
+        self.clients[websocket] = client
+        self.unfiltered.add(client)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        client = self.clients.pop(websocket, None)
+        if not client:
+            return
+
+        self._unindex(client)
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
 
-    async def broadcast(self, event_type: str, payload: dict | None = None):
-        message = {
-            "type": event_type,
-            "payload": payload or {},
+    def subscribe(self, websocket: WebSocket, filters: dict[str, list]):
+        """Заменяет фильтры клиента.
+
+        Внутри поля значения объединяются по ИЛИ, разные поля - по И.
+        """
+        client = self.clients.get(websocket)
+        if not client:
+            return
+
+        self._unindex(client)
+        client.filters = {
+            field: {filter_key(field, value) for value in values}
+            for field, values in filters.items()
+            if field in FILTER_FIELDS and values
         }
 
-        disconnected = []
+        if not client.filters:
+            self.unfiltered.add(client)
+            return
+
+        for keys in client.filters.values():
+            for key in keys:
+                self.index.setdefault(key, set()).add(client)
+
+    def _unindex(self, client: ClientConnection):
+        self.unfiltered.discard(client)
+
+        for keys in client.filters.values():
+            for key in keys:
+                subscribers = self.index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(client)
+                    if not subscribers:
+                        del self.index[key]
+
+    def _route(self, payload: dict):
+        # Пачка событий: клиент получает её, если подходит хотя бы один элемент
+        if "incidents" in payload:
+            targets = set()
+            for item in payload["incidents"]:
+                targets.update(self._route(item))
+            return targets
+
+        keys = [
+            filter_key(field, payload[field])
+            for field in FILTER_FIELDS
+            if payload.get(field) is not None
+        ]
+
+        # Служебные события без полей инцидента получают все
+        if not keys:
+            return self.clients.values()
+
+        matches = Counter()
+        for key in keys:
+            for client in self.index.get(key, ()):
+                matches[client] += 1
+
+        targets = set(self.unfiltered)
+        targets.update(
+            client
+            for client, count in matches.items()
+            if count == len(client.filters)
+        )
+        return targets
+
+    def send_text(self, websocket: WebSocket, text: str):
+        client = self.clients.get(websocket)
+        if client:
+            self._enqueue(client, text)
+
+    async def _writer(self, client: ClientConnection):
+        websocket = client.websocket
+
+        try:
+            while True:
+                text = await client.queue.get()
+                await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Клиент отключился или не принимает данные дольше send_timeout
+            self.disconnect(websocket)
+            await self._close(websocket)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def _enqueue(self, client: ClientConnection, text: str):
+        try:
+            client.queue.put_nowait(text)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_consumer_policy == "disconnect":
+            self.disconnect(client.websocket)
+            asyncio.create_task(self._close(client.websocket))
+            return
+
+        client.dropped += 1
+        ws_dropped_total.inc(self.slow_consumer_policy)
+
+        if self.slow_consumer_policy == "coalesce":
+            # Накопившиеся события заменяются одним требованием пересинхронизации
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            client.queue.put_nowait(RESYNC_MESSAGE)
+
+    def send_text_to_all(self, text: str):
+        for client in list(self.clients.values()):
+            self._enqueue(client, text)
+
+    def _receive(self, batch: list[str]):
+        started = time.perf_counter()
+        delivered = 0
+
+        for text in batch:
+            if text.startswith(INTERNAL_PREFIX):
+                self._handle_internal(text)
+                continue
+
+            delivered += 1
+            if not self.index:
+                self.send_text_to_all(text)
+                continue
+
+            event = json.loads(text)
+            for client in list(self._route(event.get("payload") or {})):
+                self._enqueue(client, text)
+
+        ws_events_total.inc(amount=delivered)
+        ws_fanout_duration.observe(time.perf_counter() - started)
+
+    def _handle_internal(self, text: str):
+        message = json.loads(text)
+        handler = self.handlers.get(message["internal"])
+        if handler is None:
+            return
+
+        try:
+            handler(message["payload"])
+        except Exception:
+            logger.exception("Ошибка обработчика сообщения %s", message["internal"])
+
+    async def broadcast(self, event_type: str, payload: dict | None = None, seq: int | None = None):
+        self.broker.publish(serialize_event(event_type, payload, seq))
 
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(
-                    json.dumps(message, ensure_ascii=False)
-                )
-            except Exception:
-                disconnected.append(connection)
+    async def publish(self, texts: list[str]):
+        """Отправка сериализованных событий без буфера брокера.
 
-        for connection in disconnected:
-            self.disconnect(connection)
+        Возвращается, когда события ушли во все воркеры; при ошибке
+        бросает PublishError.
+        """
+        await self.broker.send(texts)
 
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -0,0 +1,122 @@
+"""Синтетические инциденты с правдоподобными распределениями.
+
+Типы и приоритеты берутся из перечислений схем; веса задают, насколько
+часто встречается каждое значение. Генерация детерминирована по seed.
+"""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from app.incidents import models, schemas
+from app.incidents.risk import risk_engine
+
+
+TYPE_WEIGHTS = {
+    schemas.IncidentType.LEAK: 25,
+    schemas.IncidentType.EQUIPMENT_FAILURE: 20,
+    schemas.IncidentType.CORROSION: 15,
+    schemas.IncidentType.FIRE_HAZARD: 5,
+    schemas.IncidentType.GAS: 10,
+    schemas.IncidentType.AUTOMATION_FAILURE: 15,
+    schemas.IncidentType.OTHER: 10,
+}
+
+PRIORITY_WEIGHTS = {
+    schemas.IncidentPriority.LOW: 40,
+    schemas.IncidentPriority.MEDIUM: 35,
+    schemas.IncidentPriority.HIGH: 20,
+    schemas.IncidentPriority.CRITICAL: 5,
+}
+
+STATUS_WEIGHTS = {
+    schemas.IncidentStatus.OPEN: 20,
+    schemas.IncidentStatus.IN_PROGRESS: 20,
+    schemas.IncidentStatus.CLOSED: 60,
+}
+
+LOCATION_PREFIXES = ("УПН-", "Резервуарный парк ", "Насосная ", "Цех ", "Склад ", "Эстакада ")
+
+TITLES = {
+    schemas.IncidentType.LEAK: "Утечка нефтепродукта",
+    schemas.IncidentType.EQUIPMENT_FAILURE: "Отказ насоса",
+    schemas.IncidentType.CORROSION: "Коррозия трубопровода",
+    schemas.IncidentType.FIRE_HAZARD: "Искрение кабеля",
+    schemas.IncidentType.GAS: "Загазованность помещения",
+    schemas.IncidentType.AUTOMATION_FAILURE: "Сбой контроллера",
+    schemas.IncidentType.OTHER: "Замечание обходчика",
+}
+
+
+def _weights(enum, weights: dict) -> tuple[list, list[float]]:
+    # Новые значения перечисления попадают в выборку с весом 1
+    members = list(enum)
+    return members, [weights.get(member, 1) for member in members]
+
+
+class IncidentGenerator:
+    def __init__(self, seed: int = 1, locations: int = 200, days: int = 365):
+        self.random = random.Random(seed)
+        self.days = days
+        self.types = _weights(schemas.IncidentType, TYPE_WEIGHTS)
+        self.priorities = _weights(schemas.IncidentPriority, PRIORITY_WEIGHTS)
+        self.statuses = _weights(schemas.IncidentStatus, STATUS_WEIGHTS)
+        self.locations = [
+            f"{LOCATION_PREFIXES[index % len(LOCATION_PREFIXES)]}{index // len(LOCATION_PREFIXES) + 1}"
+            for index in range(locations)
+        ]
+        # Распределение Ципфа: несколько объектов дают большую часть тревог
+        self.location_weights = [1 / (rank + 1) for rank in range(locations)]
+
+    def _choice(self, members_and_weights):
+        members, weights = members_and_weights
+        return self.random.choices(members, weights)[0]
+
+    def location(self) -> str:
+        return self.random.choices(self.locations, self.location_weights)[0]
+
+    def create_payload(self) -> dict:
+        """Тело POST /incidents."""
+        incident_type = self._choice(self.types)
+        return {
+            "title": f"{TITLES.get(incident_type, 'Инцидент')} №{self.random.randint(1, 10**6)}",
+            "description": "Сгенерировано для нагрузочного теста",
+            "type": incident_type.value,
+            "priority": self._choice(self.priorities).value,
+            "location": self.location(),
+        }
+
+    def row(self, creator_id: int, now: datetime) -> dict:
+        """Строка таблицы incidents с риском, статусом и датами."""
+        row = self.create_payload()
+        risk_score, risk_level = risk_engine.score(row["type"], row["priority"], row["location"])
+        status = self._choice(self.statuses)
+        created_at = now - timedelta(seconds=self.random.uniform(0, self.days * 86400))
+
+        closed_at = None
+        if status == schemas.IncidentStatus.CLOSED:
+            # Время устранения - экспоненциальное со средним 8 часов
+            hours = -8 * math.log(1 - self.random.random())
+            closed_at = min(now, created_at + timedelta(hours=hours))
+
+        return {
+            **row,
+            "creator_id": creator_id,
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "status": status.value,
+            "created_at": created_at,
+            "closed_at": closed_at,
+        }
+
+
+async def populate(session_maker, count: int, creator_id: int, seed: int = 1, batch_size: int = 5000):
+    generator = IncidentGenerator(seed)
+    now = datetime.now(timezone.utc)
+
+    async with session_maker() as session:
+        for start in range(0, count, batch_size):
+            rows = [generator.row(creator_id, now) for _ in range(min(batch_size, count - start))]
+            await session.execute(insert(models.Incident.__table__), rows)
+            await session.commit()
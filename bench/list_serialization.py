@@ -0,0 +1,98 @@
+"""Сериализация списка инцидентов: ORM + jsonable_encoder против строк + pydantic-core.
+
+Без БД: сравнивается только путь от загруженных данных до байтов ответа.
+
+    python -m bench.list_serialization [инцидентов]
+"""
+import json
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from app.incidents import models, schemas
+from app.incidents.recommendations import get_recommendation
+from app.incidents.serialization import INCIDENT_ROW_COLUMNS, incident_row_to_dict
+from app.users.models import Users
+from bench.common import summarize
+from bench.data import IncidentGenerator
+
+
+# namedtuple с _asdict() - как sqlalchemy.Row
+Row = namedtuple("Row", [column.key for column in INCIDENT_ROW_COLUMNS])
+
+
+def make_data(count: int):
+    generator = IncidentGenerator()
+    now = datetime.now(timezone.utc)
+    creator = Users(id=1, email="bench@example.com", name="Bench", role="admin", hashed_password="-")
+
+    orm_items, rows = [], []
+    for incident_id in range(1, count + 1):
+        row = generator.row(creator.id, now)
+        incident = models.Incident(id=incident_id, occurrences=1, **row)
+        incident.creator = creator
+        orm_items.append(incident)
+        rows.append(Row(
+            id=incident_id, title=row["title"], type=row["type"], description=row["description"],
+            priority=row["priority"], risk_score=row["risk_score"], risk_level=row["risk_level"],
+            status=row["status"], location=row["location"], created_at=row["created_at"],
+            occurrences=1, last_occurred_at=None,
+            creator_id=creator.id, creator_name=creator.name, creator_role=creator.role,
+        ))
+
+    return orm_items, rows
+
+
+def legacy_serialize(incidents) -> bytes:
+    # Как FastAPI с response_model: объект за объектом через from_attributes,
+    # затем jsonable_encoder и json.dumps
+    for incident in incidents:
+        incident.recommendation = get_recommendation(incident.risk_score)
+    validated = [schemas.IncidentResponse.model_validate(incident) for incident in incidents]
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False).encode()
+
+
+INCIDENT_LIST_ADAPTER = TypeAdapter(list[schemas.IncidentResponse])
+
+
+def validated_serialize(rows) -> bytes:
+    # Промежуточный вариант: строки, но с проверкой схемой через TypeAdapter
+    items = [incident_row_to_dict(row) for row in rows]
+    return INCIDENT_LIST_ADAPTER.dump_json(INCIDENT_LIST_ADAPTER.validate_python(items))
+
+
+def fast_serialize(rows) -> bytes:
+    # Как json_response в маршрутах
+    return to_json([incident_row_to_dict(row) for row in rows])
+
+
+def measure(func, data, repeats: int = 10) -> dict:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(data)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main(count: int):
+    orm_items, rows = make_data(count)
+
+    scenarios = [
+        ("ORM + model_validate + jsonable_encoder", legacy_serialize, orm_items),
+        ("строки + TypeAdapter validate/dump_json", validated_serialize, rows),
+        ("строки + pydantic_core.to_json", fast_serialize, rows),
+    ]
+
+    for name, func, data in scenarios:
+        stats = measure(func, data)
+        print(f"{name:45s} {len(data):6d} шт.  p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
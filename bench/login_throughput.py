@@ -0,0 +1,63 @@
+"""Пропускная способность проверки паролей при конкурентных логинах.
+
+Сравнивает прежний вызов pwd_context.verify прямо в event loop с пулом
+из app.users.auth и замеряет задержку event loop во время нагрузки.
+
+    python -m bench.login_throughput [конкурентных_логинов]
+"""
+import asyncio
+import sys
+import time
+
+from app.users.auth import check_password, get_password_hash, verify_password
+from bench.common import summarize
+
+
+async def loop_lag(samples: list[float], stop: asyncio.Event, interval: float = 0.005):
+    # Насколько позже запланированного просыпается корутина
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def run(name: str, login, hashed: str, concurrency: int):
+    lag_samples, latencies = [], []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(loop_lag(lag_samples, stop))
+
+    async def one_login():
+        started = time.perf_counter()
+        assert await login("password", hashed)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+
+    login_stats = summarize(latencies)
+    lag_stats = summarize(lag_samples or [0.0])
+    print(
+        f"{name:10s} {concurrency / elapsed:7.1f} login/s  "
+        f"p50 {login_stats['p50_ms']:7.1f} ms  p99 {login_stats['p99_ms']:7.1f} ms  "
+        f"loop lag p99 {lag_stats['p99_ms']:7.1f} ms"
+    )
+
+
+async def inline_verify(plain: str, hashed: str) -> bool:
+    # Как было до пула: хеширование блокирует event loop
+    return verify_password(plain, hashed)
+
+
+async def main(concurrency: int):
+    hashed = get_password_hash("password")
+
+    await run("inline", inline_verify, hashed, concurrency)
+    await run("pool", check_password, hashed, concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 32))
@@ -0,0 +1,77 @@
+"""Отчёт прогона bench.suite и сравнение с сохранённым baseline."""
+import json
+import platform
+from datetime import datetime, timezone
+
+
+# Что сравнивается: метрика и направление, в котором она ухудшается
+COMPARED_METRICS = {
+    "p50_ms": "up",
+    "p95_ms": "up",
+    "p99_ms": "up",
+    "throughput_rps": "down",
+}
+
+
+def build_report(results: dict, **meta) -> dict:
+    return {
+        "meta": {
+            **meta,
+            "python": platform.python_version(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "scenarios": results,
+    }
+
+
+def save_report(report: dict, path: str):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Метрики, ухудшившиеся сильнее чем на tolerance (доля, 0.2 = 20%)."""
+    regressions = []
+
+    for name, stats in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+
+        for metric, worse in COMPARED_METRICS.items():
+            if not base.get(metric):
+                continue
+
+            ratio = stats[metric] / base[metric]
+            regressed = ratio > 1 + tolerance if worse == "up" else ratio < 1 - tolerance
+            if regressed:
+                regressions.append({
+                    "scenario": name,
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": stats[metric],
+                    "change": ratio - 1,
+                })
+
+    return regressions
+
+
+def print_results(results: dict, baseline: dict | None = None):
+    print(f"{'сценарий':14s} {'запросов':>8s} {'ошибок':>6s} {'rps':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+
+    for name, stats in results.items():
+        line = (
+            f"{name:14s} {stats['count']:8d} {stats['errors']:6d} {stats['throughput_rps']:9.1f} "
+            f"{stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f}"
+        )
+
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base and base.get("p95_ms"):
+            line += f"   p95 {stats['p95_ms'] / base['p95_ms'] - 1:+.0%} к baseline"
+
+        print(line)
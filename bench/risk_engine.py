@@ -0,0 +1,101 @@
+"""Стоимость одной оценки риска: прежний calculate_risk против RiskEngine.
+
+    python -m bench.risk_engine
+"""
+import random
+import time
+
+from app.incidents.risk import RiskEngine
+from bench.common import per_call
+
+
+def legacy_calculate_risk(incident_type: str, priority: str, location: str):
+    # Реализация до RiskEngine: словари собираются на каждый вызов
+    score = 0
+
+    type_scores = {
+        "утечка": 60,
+        "отказ оборудования": 50,
+        "коррозия": 35,
+        "пожарная опасность": 80,
+        "загазованность": 70,
+        "сбой автоматики": 45,
+        "другое": 20,
+    }
+    score += type_scores.get(incident_type.lower(), 10)
+
+    priority_scores = {
+        "низкий": 10,
+        "средний": 20,
+        "высокий": 40,
+        "критический": 60,
+    }
+    score += priority_scores.get(priority.lower(), 10)
+
+    location_scores = {  # noqa: F841 - как в исходной версии
+        "резервуар": 30,
+        "насосная": 20,
+        "склад": 10,
+    }
+
+    location_lower = location.lower()
+
+    if "упн" in location_lower:
+        score += 25
+    elif "цех" in location_lower:
+        score += 20
+    elif "резервуар" in location_lower:
+        score += 30
+    elif "насос" in location_lower:
+        score += 20
+    else:
+        score += 10
+
+    if score <= 40:
+        level = "LOW"
+    elif score <= 80:
+        level = "MEDIUM"
+    else:
+        level = "HIGH"
+
+    return score, level
+
+
+TYPES = ["утечка", "отказ оборудования", "коррозия", "пожарная опасность", "другое"]
+PRIORITIES = ["низкий", "средний", "высокий", "критический"]
+LOCATIONS = [f"УПН-{n}" for n in range(10)] + ["Резервуарный парк", "Насосная №3", "Склад ГСМ"]
+
+
+def main(calls: int = 200_000):
+    random.seed(1)
+    items = [
+        (random.choice(TYPES), random.choice(PRIORITIES), random.choice(LOCATIONS))
+        for _ in range(calls)
+    ]
+    engine = RiskEngine()
+
+    assert all(legacy_calculate_risk(*item) == engine.score(*item) for item in items[:1000])
+
+    iterator = iter(items * 2)
+    legacy = per_call(lambda: legacy_calculate_risk(*next(iterator)), calls)
+
+    iterator = iter(items * 2)
+    cold = RiskEngine(cache_size=0)
+    uncached = per_call(lambda: cold.score(*next(iterator)), calls)
+
+    iterator = iter(items * 2)
+    cached = per_call(lambda: engine.score(*next(iterator)), calls)
+
+    started = time.perf_counter()
+    engine.score_many(items)
+    batch = (time.perf_counter() - started) / calls * 1e9
+
+    print(f"legacy calculate_risk:     {legacy:8.0f} ns/call")
+    print(f"RiskEngine без кэша:       {uncached:8.0f} ns/call")
+    print(f"RiskEngine с LRU-кэшем:    {cached:8.0f} ns/call")
+    print(f"RiskEngine.score_many:     {batch:8.0f} ns/item")
+    print(engine.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Нагрузочный тест рассылки websocket-событий на 1000 клиентов.
+
+Клиенты имитируются объектами с send_text; часть из них медленные.
+Сравнивается прежняя последовательная рассылка с очередями ConnectionManager.
+
+    python -m bench.ws_fanout [клиентов] [событий]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+from app.websocket_manager import ConnectionManager
+from bench.common import summarize
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received: list[float] = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(time.perf_counter())
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def make_clients(count: int, slow_share: float = 0.01) -> list[FakeWebSocket]:
+    random.seed(1)
+    return [
+        FakeWebSocket(0.5 if random.random() < slow_share else 0)
+        for _ in range(count)
+    ]
+
+
+async def legacy_broadcast(clients: list[FakeWebSocket], message: dict):
+    # Как было: сериализация и отправка по очереди на каждого клиента
+    for client in clients:
+        await client.send_text(json.dumps(message, ensure_ascii=False))
+
+
+async def bench_legacy(clients_count: int, events: int):
+    clients = make_clients(clients_count)
+    durations = []
+
+    for event_id in range(events):
+        started = time.perf_counter()
+        await legacy_broadcast(clients, {"type": "incident_created", "payload": {"incident_id": event_id}})
+        durations.append(time.perf_counter() - started)
+
+    return durations, clients
+
+
+async def bench_queued(clients_count: int, events: int):
+    clients = make_clients(clients_count)
+    manager = ConnectionManager(queue_size=8, slow_consumer_policy="coalesce")
+
+    for client in clients:
+        await manager.connect(client)
+
+    durations = []
+    sent_at = []
+
+    for event_id in range(events):
+        started = time.perf_counter()
+        await manager.broadcast("incident_created", {"incident_id": event_id})
+        durations.append(time.perf_counter() - started)
+        sent_at.append(started)
+        await asyncio.sleep(0.01)
+
+    await asyncio.sleep(0.1)
+
+    delivery = [
+        received - sent
+        for client in clients
+        if not client.delay
+        for sent, received in zip(sent_at, client.received)
+    ]
+
+    for client in clients:
+        manager.disconnect(client)
+
+    return durations, delivery
+
+
+def report(name: str, samples: list[float]):
+    stats = summarize(samples)
+    print(
+        f"{name:34s} p50 {stats['p50_ms']:9.3f} ms  "
+        f"p95 {stats['p95_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms"
+    )
+
+
+async def main(clients_count: int, events: int):
+    print(f"{clients_count} клиентов, {events} событий, 1% медленных клиентов (0.5 с на отправку)")
+
+    durations, _ = await bench_legacy(clients_count, min(events, 5))
+    report("legacy: broadcast()", durations)
+
+    durations, delivery = await bench_queued(clients_count, events)
+    report("queued: broadcast()", durations)
+    report("queued: доставка быстрым клиентам", delivery)
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+        )
+    )
@@ -16,7 +16,10 @@ const IncidentList = ({ refreshTrigger }) => {
   data: incidents = [],
   isLoading: loading,
   error,
-  refetch
+  refetch,
+  hasMore,
+  isLoadingMore,
+  loadMore
 } = useIncidents();
 
   const queryClient = useQueryClient();
@@ -222,10 +225,24 @@ const IncidentList = ({ refreshTrigger }) => {
         </div>
       )}
 
+      {/* Следующая страница по next_cursor */}
+      {hasMore && (
+        <div className="text-center">
+          <button
+            onClick={() => loadMore().catch(() => toast.error("Ошибка загрузки инцидентов"))}
+            disabled={isLoadingMore}
+            className="bg-white hover:bg-gray-50 border border-gray-200 text-gray-700 px-6 py-3 rounded-lg font-medium transition duration-200 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Загрузка...' : 'Загрузить ещё'}
+          </button>
+        </div>
+      )}
+
       {/* Футер с информацией */}
       <div className="text-center text-gray-500 text-sm">
-        Показано {filteredIncidents.length} из {incidents.length} инцидентов
+        Показано {filteredIncidents.length} из {incidents.length}{hasMore && '+'} инцидентов
         {(searchTerm || filter !== 'all') && ' (отфильтровано)'}
+        {hasMore && ' - показаны последние, более старые загружаются по кнопке'}
       </div>
     </div>
   );
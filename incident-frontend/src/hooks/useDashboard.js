@@ -4,51 +4,21 @@ export const useDashboard = () => {
   return useQuery({
     queryKey: ["dashboard"],
     queryFn: async () => {
-      const [
-        statsRes,
-        resolutionRes,
-        riskRes,
-        locationsRes,
-        typesRes
-      ] = await Promise.all([
-        fetch(
-          "http://localhost:8000/incidents/stats",
-          {
-            credentials: "include"
-          }
-        ),
-        fetch(
-          "http://localhost:8000/incidents/stats/resolution-time",
-          {
-            credentials: "include"
-          }
-        ),
-        fetch(
-          "http://localhost:8000/incidents/stats/risk-distribution",
-          {
-            credentials: "include"
-          }
-        ),
-        fetch(
-          "http://localhost:8000/incidents/stats/locations",
-          {
-            credentials: "include"
-          }
-        ),
-        fetch(
-          "http://localhost:8000/incidents/stats/types",
-          {
-            credentials: "include"
-          }
-        )
-      ]);
+      const response = await fetch(
+        "http://localhost:8000/incidents/dashboard",
+        {
+          credentials: "include"
+        }
+      );
+
+      const dashboard = await response.json();
 
       return {
-        stats: await statsRes.json(),
-        resolution: await resolutionRes.json(),
-        riskDistribution: await riskRes.json(),
-        locations: await locationsRes.json(),
-        incidentTypes: await typesRes.json()
+        stats: dashboard.stats,
+        resolution: dashboard.resolution,
+        riskDistribution: dashboard.risk_distribution,
+        locations: dashboard.locations,
+        incidentTypes: dashboard.incident_types
       };
     }
   });
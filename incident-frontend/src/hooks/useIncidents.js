@@ -1,21 +1,82 @@
-import { useQuery } from "@tanstack/react-query";
+import { useState } from "react";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+
+const PAGE_SIZE = 200;
+
+// Курсор следующей страницы хранится отдельно от списка: WebSocketProvider
+// обновляет ["incidents"] как обычный массив
+const CURSOR_KEY = ["incidents-cursor"];
+
+const fetchPage = async (cursor) => {
+  const params = new URLSearchParams({ limit: PAGE_SIZE });
+
+  if (cursor) {
+    params.set("cursor", cursor);
+  }
+
+  const response = await fetch(
+    `http://localhost:8000/incidents/?${params}`,
+    {
+      credentials: "include"
+    }
+  );
+
+  if (!response.ok) {
+    throw new Error("Ошибка загрузки инцидентов");
+  }
+
+  return response.json();
+};
 
 export const useIncidents = () => {
-  return useQuery({
+  const queryClient = useQueryClient();
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  const query = useQuery({
     queryKey: ["incidents"],
     queryFn: async () => {
-      const response = await fetch(
-        "http://localhost:8000/incidents/",
-        {
-          credentials: "include"
-        }
-      );
+      // Перезапрос (resync, мутации) начинает список с первой страницы
+      const page = await fetchPage(null);
 
-      if (!response.ok) {
-        throw new Error("Ошибка загрузки инцидентов");
-      }
+      queryClient.setQueryData(CURSOR_KEY, page.next_cursor);
 
-      return response.json();
+      return page.items;
     }
   });
-};
\ No newline at end of file
+
+  const { data: nextCursor = null } = useQuery({
+    queryKey: CURSOR_KEY,
+    queryFn: () => null,
+    enabled: false
+  });
+
+  const loadMore = async () => {
+    if (!nextCursor || isLoadingMore) {
+      return;
+    }
+
+    setIsLoadingMore(true);
+
+    try {
+      const page = await fetchPage(nextCursor);
+      const loaded = new Set(
+        (queryClient.getQueryData(["incidents"]) || []).map((item) => item.id)
+      );
+
+      queryClient.setQueryData(["incidents"], (incidents = []) => [
+        ...incidents,
+        ...page.items.filter((item) => !loaded.has(item.id))
+      ]);
+      queryClient.setQueryData(CURSOR_KEY, page.next_cursor);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  return {
+    ...query,
+    hasMore: Boolean(nextCursor),
+    isLoadingMore,
+    loadMore
+  };
+};
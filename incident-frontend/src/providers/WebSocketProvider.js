@@ -16,62 +16,207 @@ export const WebSocketProvider = ({ children }) => {
     let socket = null;
     let reconnectTimer = null;
 
-    const connect = () => {
+    // Последнее применённое событие (номер рассылки, общий для всех воркеров
+    // и возрастающий в порядке доставки): по нему догоняем пропущенное
+    // после переподключения
+    let lastSeq = null;
+    let cancelled = false;
+
+    const resync = () => {
+        queryClient.invalidateQueries({
+            queryKey: ["incidents"]
+        });
+
+        queryClient.invalidateQueries({
+            queryKey: ["dashboard"]
+        });
+    };
 
-        socket = new WebSocket(
-        "ws://localhost:8000/incidents/ws"
-        );
+    // События несут полный инцидент, поэтому список обновляется на месте без перезапроса
+    const applyIncidentEvent = (data) => {
+        const incident = data.payload;
 
-        socket.onopen = () => {
-            console.log("WS connected");
-        };
+        queryClient.setQueryData(["incidents"], (incidents) => {
+            if (!incidents) {
+                return incidents;
+            }
 
-        socket.onmessage = (event) => {
-        const data = JSON.parse(event.data);
+            const rest = incidents.filter(
+                (item) => item.id !== incident.incident_id
+            );
 
-        console.log("WS event:", data);
+            switch (data.type) {
+                case "incident_created":
+                    return [incident, ...rest];
 
-        switch (data.type) {
+                case "incident_deleted":
+                    return rest;
 
-            case "incident_created":
+                default:
+                    return incidents.map((item) =>
+                        item.id === incident.incident_id ? incident : item
+                    );
+            }
+        });
 
-            queryClient.invalidateQueries({
-                queryKey: ["incidents"]
-            });
+        queryClient.invalidateQueries({
+            queryKey: ["dashboard"]
+        });
+    };
+
+    const applyIncidentsBatch = (data) => {
+        const created = data.payload.incidents;
+        const ids = new Set(created.map((incident) => incident.id));
+
+        queryClient.setQueryData(["incidents"], (incidents) => {
+            if (!incidents) {
+                return incidents;
+            }
+
+            return [
+                ...created.slice().reverse(),
+                ...incidents.filter((item) => !ids.has(item.id))
+            ];
+        });
+
+        queryClient.invalidateQueries({
+            queryKey: ["dashboard"]
+        });
+    };
 
-            queryClient.invalidateQueries({
-                queryKey: ["dashboard"]
+    // Повторные тревоги меняют только счётчик, дашборд не затрагивают
+    const applyRepeats = (data) => {
+        const repeats = new Map(
+            data.payload.incidents.map((item) => [item.id, item])
+        );
+
+        queryClient.setQueryData(["incidents"], (incidents) => {
+            if (!incidents) {
+                return incidents;
+            }
+
+            return incidents.map((item) => {
+                const repeat = repeats.get(item.id);
+
+                return repeat
+                    ? {
+                        ...item,
+                        occurrences: repeat.occurrences,
+                        last_occurred_at: repeat.last_occurred_at
+                    }
+                    : item;
             });
+        });
+    };
 
-            break;
+    const handleEvent = (data) => {
+
+        if (data.seq !== undefined) {
+            lastSeq = Math.max(lastSeq ?? 0, data.seq);
+        }
+
+        switch (data.type) {
 
+            case "incident_created":
             case "incident_updated":
+            case "incident_deleted":
 
-            queryClient.invalidateQueries({
-                queryKey: ["incidents"]
-            });
+            applyIncidentEvent(data);
 
-            queryClient.invalidateQueries({
-                queryKey: ["dashboard"]
-            });
+            break;
+
+            case "incidents_created":
+
+            applyIncidentsBatch(data);
 
             break;
 
-            case "incident_deleted":
+            case "incidents_repeated":
 
-            queryClient.invalidateQueries({
-                queryKey: ["incidents"]
-            });
+            applyRepeats(data);
 
-            queryClient.invalidateQueries({
-                queryKey: ["dashboard"]
-            });
+            break;
+
+            // Сервер пропустил часть событий для этого клиента
+            case "resync":
+
+            resync();
 
             break;
 
             default:
             break;
         }
+    };
+
+    const fetchChanges = async (since) => {
+        const query = since === null ? "" : `?since=${since}`;
+        const response = await fetch(
+            `http://localhost:8000/incidents/changes${query}`,
+            {
+                credentials: "include"
+            }
+        );
+
+        if (!response.ok) {
+            throw new Error(`changes: ${response.status}`);
+        }
+
+        return response.json();
+    };
+
+    // Текущий номер при монтировании: иначе обрыв до первого события
+    // нечем было бы догнать
+    const seed = async () => {
+        try {
+            const changes = await fetchChanges(null);
+            lastSeq = lastSeq ?? changes.seq;
+        } catch (error) {
+            // Номер остаётся null: catchUp после подключения перечитает данные
+        }
+    };
+
+    const catchUp = async () => {
+        if (lastSeq === null) {
+            // Номер так и не получен - перечитываем всё и пробуем снова
+            resync();
+            await seed();
+            return;
+        }
+
+        try {
+            const changes = await fetchChanges(lastSeq);
+
+            if (changes.reset) {
+                lastSeq = changes.seq;
+                resync();
+                return;
+            }
+
+            changes.changes.forEach(handleEvent);
+        } catch (error) {
+            resync();
+        }
+    };
+
+    const connect = () => {
+
+        socket = new WebSocket(
+        "ws://localhost:8000/incidents/ws"
+        );
+
+        socket.onopen = () => {
+            console.log("WS connected");
+
+            catchUp();
+        };
+
+        socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+
+        console.log("WS event:", data);
+
+        handleEvent(data);
         };
 
         socket.onclose = () => {
@@ -80,6 +225,10 @@ export const WebSocketProvider = ({ children }) => {
             "WS disconnected"
         );
 
+        if (cancelled) {
+            return;
+        }
+
         reconnectTimer = setTimeout(
             () => {
             connect();
@@ -89,10 +238,16 @@ export const WebSocketProvider = ({ children }) => {
         };
     };
 
-    connect();
+    seed().then(() => {
+        if (!cancelled) {
+            connect();
+        }
+    });
 
     return () => {
 
+        cancelled = true;
+
         if (reconnectTimer) {
         clearTimeout(
             reconnectTimer
@@ -0,0 +1,16 @@
+-- Индексы под keyset-пагинацию и фильтры списка (app/incidents/models.py).
+-- CONCURRENTLY не блокирует запись; выполнять вне транзакции:
+--     psql "$DATABASE_URL" -f migrations/001_incident_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_created_at_id
+    ON incidents (created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_status_created_at_id
+    ON incidents (status, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_priority_created_at_id
+    ON incidents (priority, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_type_created_at_id
+    ON incidents (type, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_risk_level_created_at_id
+    ON incidents (risk_level, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_location_created_at_id
+    ON incidents (location, created_at, id);
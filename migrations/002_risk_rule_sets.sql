@@ -0,0 +1,8 @@
+-- Версии таблиц оценки риска (app/incidents/risk_rules.py)
+
+CREATE TABLE IF NOT EXISTS risk_rule_sets (
+    id SERIAL PRIMARY KEY,
+    rules JSON NOT NULL,
+    created_by INTEGER REFERENCES users (id),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
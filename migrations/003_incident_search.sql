@@ -0,0 +1,13 @@
+-- Индексы поиска (app/incidents/search.py). CONCURRENTLY - вне транзакции.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_search
+    ON incidents USING gin (
+        to_tsvector(
+            'russian',
+            coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(location, '')
+        )
+    );
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidents_location_trgm
+    ON incidents USING gin (location gin_trgm_ops);
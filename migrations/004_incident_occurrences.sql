@@ -0,0 +1,7 @@
+-- Счётчик повторных тревог (app/incidents/dedup.py). Списки инцидентов
+-- выбирают эти колонки, поэтому миграция нужна до выкладки приложения.
+-- DEFAULT-константа в PostgreSQL 11+ не переписывает таблицу.
+
+ALTER TABLE incidents
+    ADD COLUMN IF NOT EXISTS occurrences INTEGER NOT NULL DEFAULT 1,
+    ADD COLUMN IF NOT EXISTS last_occurred_at TIMESTAMP WITH TIME ZONE;
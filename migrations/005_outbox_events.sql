@@ -0,0 +1,14 @@
+-- Outbox событий для websocket-клиентов (app/incidents/outbox.py)
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id SERIAL PRIMARY KEY,
+    event_type VARCHAR NOT NULL,
+    payload JSON NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    dispatched_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS ix_outbox_events_pending
+    ON outbox_events (id) WHERE dispatched_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_outbox_events_dispatched_at
+    ON outbox_events (dispatched_at);
@@ -0,0 +1,10 @@
+-- Номер события в порядке рассылки (app/incidents/outbox.py). Уже
+-- разосланные события получают номер, равный id, - его клиенты и хранят.
+
+ALTER TABLE outbox_events ADD COLUMN IF NOT EXISTS dispatch_seq BIGINT;
+
+UPDATE outbox_events SET dispatch_seq = id
+    WHERE dispatched_at IS NOT NULL AND dispatch_seq IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_outbox_events_dispatch_seq
+    ON outbox_events (dispatch_seq);
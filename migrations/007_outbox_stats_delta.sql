@@ -0,0 +1,3 @@
+-- Изменение агрегатов статистики вместе с событием (app/incidents/stats_cache.py)
+
+ALTER TABLE outbox_events ADD COLUMN IF NOT EXISTS stats_delta JSON;
@@ -0,0 +1,13 @@
+-- Состояние фоновых пересчётов рисков (app/incidents/recalculation.py)
+
+CREATE TABLE IF NOT EXISTS risk_recalculation_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    status VARCHAR NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
@@ -0,0 +1,13 @@
+import os
+
+# Settings читаются при импорте app.config; к БД тесты не подключаются
+for name, value in {
+    "SECRET_KEY": "test-secret-key",
+    "ALGORITHM": "HS256",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "incidents_test",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,125 @@
+from app.incidents import ingest, schemas
+from app.incidents.dedup import DedupIndex, dedup_key, is_escalation
+
+
+def alarm(location: str = "УПН-1", incident_type: str = "утечка", priority: str = "высокий"):
+    return schemas.IncidentCreate(
+        title="Тревога",
+        description="Сработал датчик",
+        type=incident_type,
+        priority=priority,
+        location=location,
+    )
+
+
+def test_key_ignores_case_and_spacing():
+    assert dedup_key("Утечка ", "  УПН   1 ") == dedup_key("утечка", "упн 1")
+
+
+def test_window_overrides():
+    index = DedupIndex(300, {"Утечка": 60, "утечка:критический": 0})
+
+    assert index.window_for("коррозия", "низкий") == 300
+    assert index.window_for("утечка", "низкий") == 60
+    assert index.window_for("Утечка", "Критический") == 0
+    assert index.max_window == 300
+
+
+def test_match_within_window_only():
+    index = DedupIndex(300, {})
+    index.remember("утечка", "УПН-1", 7, seen_at=1000, priority="средний")
+
+    assert index.match("утечка", "высокий", "упн-1", now=1200) == (7, "средний")
+    assert index.match("утечка", "высокий", "упн-1", now=1301) is None
+    assert index.match("коррозия", "высокий", "упн-1", now=1200) is None
+
+
+def test_zero_window_disables_matching():
+    index = DedupIndex(0, {})
+    index.remember("утечка", "УПН-1", 7, seen_at=1000, priority="высокий")
+
+    assert index.match("утечка", "высокий", "УПН-1", now=1000) is None
+
+
+def test_remember_replaces_and_forget_removes():
+    index = DedupIndex(300, {})
+    index.remember("утечка", "УПН-1", 7, seen_at=1000, priority="высокий")
+    index.remember("утечка", "УПН-1", 8, seen_at=1010, priority="высокий")
+
+    # Забытый старый инцидент не должен удалить запись нового
+    index.forget(7)
+    assert index.match("утечка", "высокий", "УПН-1", now=1020) == (8, "высокий")
+
+    index.forget(8)
+    assert index.match("утечка", "высокий", "УПН-1", now=1020) is None
+
+
+def test_fold_repeats_of_open_incident_and_within_batch(monkeypatch):
+    index = DedupIndex(300, {})
+    index.remember("утечка", "УПН-1", 7, seen_at=1000, priority="высокий")
+    monkeypatch.setattr(ingest, "dedup_index", index)
+
+    incidents = [alarm("УПН-1"), alarm("Цех 2"), alarm("цех  2"), alarm("Резервуар")]
+
+    new, repeats, escalations, folded = ingest._fold(
+        incidents, [0, 1, 2, 3], now=1100, skip_ids=set()
+    )
+
+    assert [(item.location, position, count) for item, position, count in new] == [
+        ("Цех 2", 1, 2),
+        ("Резервуар", 3, 1),
+    ]
+    assert repeats == {7: 1}
+    assert escalations == {}
+    assert folded == [
+        {"index": 0, "incident_id": 7},
+        {"index": 2, "new_position": 0},
+    ]
+
+
+def test_fold_skips_ids_missing_in_db(monkeypatch):
+    index = DedupIndex(300, {})
+    index.remember("утечка", "УПН-1", 7, seen_at=1000, priority="высокий")
+    monkeypatch.setattr(ingest, "dedup_index", index)
+
+    new, repeats, _, folded = ingest._fold([alarm(), alarm()], [0, 1], now=1100, skip_ids={7})
+
+    assert [(position, count) for _, position, count in new] == [(0, 2)]
+    assert not repeats
+    assert folded == [{"index": 1, "new_position": 0}]
+
+
+def test_fold_without_window_keeps_every_alarm(monkeypatch):
+    monkeypatch.setattr(ingest, "dedup_index", DedupIndex(0, {}))
+
+    new, repeats, _, folded = ingest._fold([alarm(), alarm()], [0, 1], now=1100, skip_ids=set())
+
+    assert len(new) == 2
+    assert not repeats and not folded
+
+
+def test_priority_order():
+    assert is_escalation("критический", "высокий")
+    assert not is_escalation("низкий", "средний")
+    assert not is_escalation("высокий", "высокий")
+    assert is_escalation("низкий", None)
+
+
+def test_higher_priority_repeat_escalates_instead_of_folding_silently(monkeypatch):
+    index = DedupIndex(300, {})
+    index.remember("утечка", "УПН-1", 7, seen_at=1000, priority="низкий")
+    monkeypatch.setattr(ingest, "dedup_index", index)
+
+    incidents = [
+        alarm("УПН-1", priority="критический"),
+        alarm("УПН-1", priority="средний"),
+        alarm("Цех 2", priority="низкий"),
+        alarm("Цех 2", priority="высокий"),
+    ]
+
+    new, repeats, escalations, _ = ingest._fold(incidents, [0, 1, 2, 3], now=1100, skip_ids=set())
+
+    assert repeats == {7: 2}
+    assert escalations == {7: "критический"}
+    # Внутри пачки новый инцидент создаётся с наивысшим приоритетом повторов
+    assert [(item.priority.value, count) for item, _, count in new] == [("высокий", 2)]
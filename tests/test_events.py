@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+from app.brokers import NOTIFY_PAYLOAD_LIMIT, RESYNC_EVENT, PostgresBroker, PublishError
+from app.incidents.events import batch_payloads
+
+
+def incident_payload(incident_id: int) -> dict:
+    return {
+        "id": incident_id,
+        "incident_id": incident_id,
+        "title": "Утечка на насосной станции",
+        "description": "Повышенное давление на выходе насоса, течь фланца " * 10,
+        "type": "утечка",
+        "priority": "высокий",
+        "status": "открыт",
+        "location": "УПН-1",
+        "risk_score": 125,
+        "risk_level": "HIGH",
+        "creator": {"id": 1, "name": "Оператор", "role": "operator"},
+    }
+
+
+def test_bulk_payloads_fit_notify_limit():
+    items = [incident_payload(i) for i in range(50)]
+
+    events = batch_payloads(items)
+
+    assert len(events) > 1
+    assert [item for event in events for item in event["incidents"]] == items
+    for event in events:
+        assert event["count"] == len(event["incidents"])
+        message = json.dumps(
+            {"seq": 10**9, "type": "incidents_created", "payload": event},
+            ensure_ascii=False,
+        )
+        notify = json.dumps([message], ensure_ascii=False)
+        assert len(notify.encode()) <= NOTIFY_PAYLOAD_LIMIT
+
+
+def test_own_resync_notify_is_ignored():
+    received = []
+    broker = PostgresBroker("postgresql://-", "incident_events", 0.02, 100)
+    broker.handler = received.append
+    broker._notify_pid = 42
+
+    broker._on_notify(None, 42, "incident_events", json.dumps([RESYNC_EVENT]))
+    assert received == []
+
+    broker._on_notify(None, 43, "incident_events", json.dumps([RESYNC_EVENT]))
+    assert received == [[RESYNC_EVENT]]
+
+
+class FakeNotifyConnection:
+    def __init__(self, fail_on: int):
+        self.payloads = []
+        self.fail_on = fail_on
+
+    def is_closed(self):
+        return False
+
+    async def execute(self, query, channel, payload):
+        if len(self.payloads) == self.fail_on:
+            self.fail_on = None
+            raise ConnectionError("connection lost")
+        self.payloads.append(payload)
+
+
+def test_failed_notify_delivers_only_unsent_chunks_and_resyncs_others():
+    received = []
+    broker = PostgresBroker("postgresql://-", "incident_events", 0.02, 100)
+    broker.handler = received.append
+    broker._notify_connection = FakeNotifyConnection(fail_on=1)
+
+    first, second = ("x" * 5000, "y" * 5000)
+    asyncio.run(broker._publish_batch([first, second]))
+
+    # Первая часть ушла через NOTIFY (свои клиенты получат её через LISTEN)
+    assert broker._notify_connection.payloads == [json.dumps([first])]
+    assert received == [[second]]
+
+    asyncio.run(broker.send(["z"]))
+
+    assert broker._notify_connection.payloads[1:] == [
+        json.dumps([RESYNC_EVENT]),
+        json.dumps(["z"]),
+    ]
+
+
+def test_send_raises_with_unsent_events():
+    broker = PostgresBroker("postgresql://-", "incident_events", 0.02, 100)
+    broker.handler = lambda batch: None
+    broker._notify_connection = FakeNotifyConnection(fail_on=0)
+
+    with pytest.raises(PublishError) as error:
+        asyncio.run(broker.send(["a", "b"]))
+
+    assert error.value.unsent == ["a", "b"]
+
+    assert not broker._resync_pending
@@ -0,0 +1,56 @@
+from app.monitoring.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Задержка", labels=("route",), buckets=(0.1, 1))
+
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.1, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(3, "/a")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Задержка",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_histogram_without_labels():
+    histogram = Histogram("size", "Размер", buckets=(1,))
+    histogram.observe(2)
+
+    assert histogram.samples() == [
+        'size_bucket{le="1.0"} 0',
+        'size_bucket{le="+Inf"} 1',
+        "size_sum 2.0",
+        "size_count 1",
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("events_total", "События", labels=("path",))
+    counter.inc('a"b\\c\nd')
+    counter.inc('a"b\\c\nd', amount=2)
+
+    assert counter.samples() == ['events_total{path="a\\"b\\\\c\\nd"} 3']
+
+
+def test_registry_renders_all_metrics():
+    registry = Registry()
+    registry.register(Gauge("connections", "Соединения", lambda: {(): 3}))
+    counter = registry.register(Counter("requests_total", "Запросы"))
+    counter.inc()
+
+    assert registry.render() == (
+        "# HELP connections Соединения\n"
+        "# TYPE connections gauge\n"
+        "connections 3\n"
+        "# HELP requests_total Запросы\n"
+        "# TYPE requests_total counter\n"
+        "requests_total 1\n"
+    )
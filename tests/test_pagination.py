@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.incidents.pagination import build_page, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+    cursor = encode_cursor(created_at, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "не-base64",
+        "bm90LWpzb24",  # "not-json"
+        "WzFd",  # [1]
+        "bnVsbA",  # null
+        "WyJ2Y2hlcmEiLCAxXQ",  # ["vchera", 1]
+        "WyIyMDI2LTA1LTAxVDEyOjAwOjAwIiwgIngiXQ",  # ["2026-05-01T12:00:00", "x"]
+    ],
+)
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+
+    assert error.value.status_code == 400
+
+
+def test_build_page_sets_next_cursor_from_last_item():
+    created_at = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    rows = [SimpleNamespace(id=index, created_at=created_at) for index in (5, 4, 3)]
+
+    page = build_page(rows, limit=2)
+
+    assert [row.id for row in page["items"]] == [5, 4]
+    assert decode_cursor(page["next_cursor"]) == (created_at, 4)
+
+
+def test_last_page_has_no_cursor():
+    rows = [SimpleNamespace(id=1, created_at=datetime(2026, 5, 1, tzinfo=timezone.utc))]
+
+    assert build_page(rows, limit=2) == {"items": rows, "next_cursor": None}
@@ -0,0 +1,80 @@
+import asyncio
+import cProfile
+from types import SimpleNamespace
+
+from app.monitoring import profiling
+from app.monitoring.profiling import ProfileStore, RequestProfile
+from app.users.auth import create_access_token
+
+
+SCOPE = {"type": "http", "method": "GET", "path": "/incidents/"}
+
+
+def make_profile(profile_id: str, duration: float, sampled: bool = True) -> RequestProfile:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    sum(range(10))
+    profiler.disable()
+    return RequestProfile(profile_id, SCOPE, profiler, duration, 200, sampled)
+
+
+def test_keeps_only_the_slowest_sampled_profiles():
+    store = ProfileStore(slowest_keep=2)
+
+    for profile_id, duration in (("a", 0.3), ("b", 0.1), ("c", 0.5), ("d", 0.2)):
+        store.add(make_profile(profile_id, duration))
+
+    assert [item["id"] for item in store.listing()["slowest"]] == ["c", "a"]
+    assert store.get("b") is None
+    assert store.get("c").duration == 0.5
+
+
+def test_requested_profiles_are_kept_separately_in_fifo_order():
+    store = ProfileStore(slowest_keep=1, requested_keep=2)
+    store.add(make_profile("slow", 1.0))
+
+    for profile_id in ("r1", "r2", "r3"):
+        store.add(make_profile(profile_id, 0.01, sampled=False))
+
+    listing = store.listing()
+    assert [item["id"] for item in listing["requested"]] == ["r3", "r2"]
+    assert [item["id"] for item in listing["slowest"]] == ["slow"]
+    assert store.get("r1") is None
+
+
+def test_clear():
+    store = ProfileStore(slowest_keep=1)
+    store.add(make_profile("a", 0.1))
+    store.add(make_profile("b", 0.1, sampled=False))
+
+    store.clear()
+
+    assert store.listing() == {"requested": [], "slowest": []}
+
+
+def test_profile_renders_and_dumps():
+    profile = make_profile("a", 0.1)
+
+    assert "function calls" in profile.render(limit=5)
+    assert profile.dump()
+    assert profile.summary()["route"] is None
+
+
+def test_profile_flag_uses_stored_role_not_token_claim(monkeypatch):
+    token = create_access_token({"sub": "7", "role": "admin", "name": "Бывший админ"})
+    scope = {
+        **SCOPE,
+        "query_string": b"profile=1",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+    roles = {7: "operator"}
+
+    async def get_user_by_id(user_id, session=None):
+        return SimpleNamespace(id=user_id, role=roles[user_id])
+
+    monkeypatch.setattr(profiling, "get_user_by_id", get_user_by_id)
+
+    assert not asyncio.run(profiling.profile_requested(scope))
+
+    roles[7] = "admin"
+    assert asyncio.run(profiling.profile_requested(scope))
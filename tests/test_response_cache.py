@@ -0,0 +1,84 @@
+from pydantic import TypeAdapter
+from starlette.requests import Request
+
+from app.response_cache import ResponseCache, etag_matches, render
+
+
+ADAPTER = TypeAdapter(dict)
+
+
+def make_request(path: str = "/incidents/stats", query: str = "", if_none_match: str | None = None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": headers,
+    })
+
+
+def test_etag_depends_only_on_body():
+    assert render({"total": 1}, ADAPTER).etag == render({"total": 1}, ADAPTER, version=5).etag
+    assert render({"total": 1}, ADAPTER).etag != render({"total": 2}, ADAPTER).etag
+
+
+def test_etag_matches_header_forms():
+    etag = render({"total": 1}, ADAPTER).etag
+
+    assert not etag_matches(make_request(), etag)
+    assert etag_matches(make_request(if_none_match=etag), etag)
+    assert etag_matches(make_request(if_none_match=f'"other", W/{etag}'), etag)
+    assert etag_matches(make_request(if_none_match="*"), etag)
+    assert not etag_matches(make_request(if_none_match='"other"'), etag)
+
+
+def test_respond_builds_once_per_version():
+    cache = ResponseCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"total": len(builds)}
+
+    first = cache.respond(make_request(), 1, build, ADAPTER)
+    again = cache.respond(make_request(), 1, build, ADAPTER)
+    changed = cache.respond(make_request(), 2, build, ADAPTER)
+
+    assert len(builds) == 2
+    assert first.body == again.body == b'{"total":1}'
+    assert changed.body == b'{"total":2}'
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+
+def test_query_parameters_are_part_of_the_key():
+    cache = ResponseCache()
+
+    cache.respond(make_request(query="a=1&b=2"), 1, lambda: {"x": 1}, ADAPTER)
+    cache.respond(make_request(query="b=2&a=1"), 1, lambda: {"x": 2}, ADAPTER)
+    cache.respond(make_request(query="a=2"), 1, lambda: {"x": 3}, ADAPTER)
+
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 2}
+
+
+def test_not_modified_when_etag_matches():
+    cache = ResponseCache()
+    response = cache.respond(make_request(), 1, lambda: {"total": 1}, ADAPTER)
+    etag = response.headers["etag"]
+
+    conditional = cache.respond(make_request(if_none_match=etag), 1, lambda: {"total": 1}, ADAPTER)
+
+    assert conditional.status_code == 304
+    assert conditional.body == b""
+    assert conditional.headers["etag"] == etag
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+
+    for path in ("/a", "/b", "/a", "/c"):
+        cache.respond(make_request(path), 1, lambda: {}, ADAPTER)
+
+    assert [key[0] for key in cache._entries] == ["/a", "/c"]
@@ -0,0 +1,31 @@
+from app.incidents.risk import RiskEngine
+
+
+def test_cache_key_is_normalized():
+    engine = RiskEngine()
+
+    first = engine.score("Утечка", "Высокий", "УПН-1 ")
+    second = engine.score("утечка ", "высокий", "упн-1")
+
+    assert first == second
+    info = engine.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_score_many_matches_score():
+    engine = RiskEngine()
+    items = [("утечка", "высокий", "УПН-1"), ("Коррозия", "низкий", "Цех 3"), ("утечка", "высокий", "упн-1")]
+
+    assert engine.score_many(items) == [engine.score(*item) for item in items]
+
+
+def test_load_resets_cache_and_tracks_version():
+    engine = RiskEngine()
+    engine.score("утечка", "высокий", "УПН-1")
+
+    rules = {**engine.rules, "type_scores": {**engine.rules["type_scores"], "утечка": 0}}
+    engine.load(rules, version=7)
+
+    assert engine.version == 7
+    assert engine.cache_info().currsize == 0
+    assert engine.score("утечка", "высокий", "УПН-1")[0] == 40 + 25
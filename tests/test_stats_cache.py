@@ -0,0 +1,136 @@
+import asyncio
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from app.incidents import schemas
+from app.incidents import stats_cache as stats_cache_module
+from app.incidents.stats_cache import StatsCache, incident_snapshot, stats_delta
+
+
+def warm_cache(incident: dict) -> StatsCache:
+    cache = StatsCache()
+    cache.aggregates = {
+        "total": 1,
+        "risk_sum": incident["risk_score"],
+        "resolution_seconds": 0.0,
+        "resolved": 0,
+        "status": Counter({incident["status"]: 1}),
+        "location": Counter({incident["location"]: 1}),
+        "type": Counter({incident["type"]: 1}),
+        "risk_level": Counter({incident["risk_level"]: 1}),
+    }
+    return cache
+
+
+def apply(cache: StatsCache, before: dict | None, after: dict | None, seq: int = 1, event_id: int = 1):
+    # Так дельта приходит от OutboxDispatcher через брокер
+    delta = stats_delta([(before and incident_snapshot(before), after and incident_snapshot(after))])
+    cache.receive({"seq": seq, "id": event_id, "delta": delta})
+
+
+def open_incident() -> dict:
+    # asyncpg возвращает timestamptz как datetime с часовым поясом
+    return {
+        "status": schemas.IncidentStatus.OPEN.value,
+        "location": "УПН-1",
+        "type": "утечка",
+        "risk_level": "HIGH",
+        "risk_score": 125,
+        "created_at": datetime.now(timezone.utc) - timedelta(hours=1),
+        "closed_at": None,
+    }
+
+
+def test_close_without_closed_at_on_warm_cache():
+    incident = open_incident()
+    cache = warm_cache(incident)
+
+    closed = {
+        **incident,
+        "status": schemas.IncidentStatus.CLOSED.value,
+        "closed_at": datetime.now(timezone.utc),
+    }
+    apply(cache, incident, closed)
+
+    assert cache.aggregates["resolved"] == 1
+    assert 3500 < cache.aggregates["resolution_seconds"] < 3700
+    assert cache.aggregates["status"] == Counter({schemas.IncidentStatus.CLOSED.value: 1})
+
+
+def test_close_with_naive_closed_at_from_client():
+    incident = open_incident()
+    cache = warm_cache(incident)
+
+    update = schemas.IncidentStatusUpdate(
+        status=schemas.IncidentStatus.CLOSED,
+        closed_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    assert update.closed_at.tzinfo is not None
+
+    closed = {**incident, "status": update.status.value, "closed_at": update.closed_at}
+    apply(cache, incident, closed)
+
+    assert cache.aggregates["resolved"] == 1
+
+
+def test_naive_created_at_is_treated_as_utc():
+    incident = {**open_incident(), "created_at": datetime.utcnow() - timedelta(minutes=10)}
+    cache = warm_cache(incident)
+
+    closed = {**incident, "closed_at": datetime.now(timezone.utc)}
+    apply(cache, incident, closed)
+
+    assert 590 < cache.aggregates["resolution_seconds"] < 610
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def test_rebuild_replays_only_deltas_missing_from_the_snapshot(monkeypatch):
+    incident = open_incident()
+    cache = warm_cache(incident)
+
+    async def read_snapshot(session):
+        # Пока читается снимок, приходят три события:
+        # разосланное до снимка, ждавшее рассылки и закоммиченное после
+        apply(cache, None, incident, seq=5, event_id=50)
+        apply(cache, None, incident, seq=6, event_id=60)
+        apply(cache, None, incident, seq=7, event_id=70)
+        return warm_cache(incident).aggregates, 5, {60}
+
+    monkeypatch.setattr(stats_cache_module, "async_session_maker", FakeSession)
+    monkeypatch.setattr(stats_cache_module, "read_snapshot", read_snapshot)
+
+    asyncio.run(cache.rebuild())
+
+    assert cache.aggregates["total"] == 2
+    assert cache.aggregates["risk_level"] == Counter({"HIGH": 2})
+    assert cache.rebuilt_at.tzinfo is not None
+
+    apply(cache, None, incident, seq=8, event_id=80)
+    assert cache.aggregates["total"] == 3
+
+
+def test_delta_on_cold_cache_is_ignored():
+    cache = StatsCache()
+
+    apply(cache, None, open_incident())
+
+    assert cache.aggregates is None
+
+
+def test_delta_survives_json_round_trip():
+    incident = open_incident()
+    closed = {**incident, "location": None, "closed_at": datetime.now(timezone.utc)}
+
+    delta = json.loads(json.dumps(stats_delta([(incident_snapshot(incident), incident_snapshot(closed))])))
+
+    assert delta["total"] == 0
+    assert delta["resolved"] == 1
+    assert dict(map(tuple, delta["location"])) == {None: 1, "УПН-1": -1}
@@ -0,0 +1,109 @@
+import asyncio
+
+from app.brokers import InMemoryBroker
+from app.websocket_manager import ConnectionManager, serialize_event, serialize_internal
+
+
+class FakeWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        pass
+
+
+def routed(manager: ConnectionManager, payload: dict) -> set:
+    return {client.websocket for client in manager._route(payload)}
+
+
+def run_with_clients(count: int, scenario):
+    async def main():
+        manager = ConnectionManager(broker=InMemoryBroker(0.01, 100))
+        sockets = [FakeWebSocket() for _ in range(count)]
+        for websocket in sockets:
+            await manager.connect(websocket)
+        try:
+            scenario(manager, *sockets)
+        finally:
+            for websocket in sockets:
+                manager.disconnect(websocket)
+
+    asyncio.run(main())
+
+
+def test_unfiltered_clients_receive_everything():
+    def scenario(manager, first, second):
+        assert routed(manager, {"location": "УПН-1", "risk_level": "HIGH"}) == {first, second}
+
+    run_with_clients(2, scenario)
+
+
+def test_values_of_one_field_are_or_and_fields_are_and():
+    def scenario(manager, by_location, by_location_and_level, everything):
+        manager.subscribe(by_location, {"location": ["УПН-1", "Цех 2"]})
+        manager.subscribe(
+            by_location_and_level, {"location": ["УПН-1"], "risk_level": ["HIGH"]}
+        )
+
+        assert routed(manager, {"location": " упн-1 ", "risk_level": "LOW"}) == {
+            by_location,
+            everything,
+        }
+        assert routed(manager, {"location": "УПН-1", "risk_level": "HIGH"}) == {
+            by_location,
+            by_location_and_level,
+            everything,
+        }
+        assert routed(manager, {"location": "Цех 2", "risk_level": "HIGH"}) == {
+            by_location,
+            everything,
+        }
+        assert routed(manager, {"location": "Резервуар 7"}) == {everything}
+
+    run_with_clients(3, scenario)
+
+
+def test_unknown_fields_and_empty_filters_mean_unfiltered():
+    def scenario(manager, client):
+        manager.subscribe(client, {"title": ["утечка"], "location": []})
+
+        assert client in routed(manager, {"location": "УПН-1"})
+        assert manager.index == {}
+
+    run_with_clients(1, scenario)
+
+
+def test_resubscribe_and_disconnect_clean_the_index():
+    def scenario(manager, client, other):
+        manager.subscribe(client, {"location": ["УПН-1"]})
+        manager.subscribe(client, {"incident_id": [7]})
+
+        assert routed(manager, {"location": "УПН-1", "incident_id": 8}) == {other}
+        assert routed(manager, {"location": "УПН-1", "incident_id": 7}) == {client, other}
+
+        manager.disconnect(client)
+        assert manager.index == {}
+
+    run_with_clients(2, scenario)
+
+
+def test_service_events_go_to_everyone():
+    def scenario(manager, client):
+        manager.subscribe(client, {"location": ["УПН-1"]})
+
+        assert routed(manager, {}) == {client}
+
+    run_with_clients(1, scenario)
+
+
+def test_internal_messages_go_to_handlers_not_clients():
+    def scenario(manager, client):
+        received = []
+        manager.add_handler("stats", received.append)
+
+        manager._receive([serialize_internal("stats", {"seq": 1}), serialize_event("ping")])
+
+        assert received == [{"seq": 1}]
+        assert manager.clients[client].queue.qsize() == 1
+
+    run_with_clients(1, scenario)